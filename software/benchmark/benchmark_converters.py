@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Host-side converter benchmarks for mem_builder and simpoint_tools.
+
+Generates synthetic inputs of configurable size (write logs, interval dump
+binaries, hex dumps and a minimal ELF carrying .data / Init_counter), runs each
+converter as a subprocess and records wall/user/system time and peak RSS, the
+same JobResourceUse fields as instrumentation/benchmark/scripts/monitor_job.py.
+Resource use is taken from os.wait4, so /usr/bin/time is not required.
+
+Results are written as JSON; pass --baseline with an earlier result file to
+print the per-converter runtime ratio against it.
+
+Example:
+  python benchmark_converters.py --sizes 1M 64M 1G -N 3 -o bench.json
+  python benchmark_converters.py --sizes 64M --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import struct
+import subprocess
+import sys
+import time
+from statistics import median
+from typing import List, NamedTuple
+
+import numpy as np
+
+SOFTWARE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEM_BUILDER = os.path.join(SOFTWARE, 'mem_builder')
+SIMPOINT_SCRIPTS = os.path.join(SOFTWARE, 'simpoint_tools', 'scripts')
+
+# Synthetic dumps start at this address; .data sits in the middle of the dump
+DUMP_BASE = 0x100000000
+
+# All times in seconds, sizes in kibibytes (KiB)
+JobResourceUse = NamedTuple('JobResourceUse', [('user_time', float),
+                                               ('system_time', float),
+                                               ('wall_clock_time', float),
+                                               ('maxrss', int)])
+
+
+class JobFailedError(Exception):
+    pass
+
+
+def run_job(args: List[str]) -> JobResourceUse:
+    """Run a job and return its own (not cumulative) resource usage."""
+    start = time.monotonic()
+    proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = proc.stderr.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.monotonic() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    proc.stderr.close()
+    if proc.returncode != 0:
+        raise JobFailedError("{}\n[stderr]\n{}".format(' '.join(args), stderr.decode('utf-8', 'replace')))
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    maxrss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return JobResourceUse(usage.ru_utime, usage.ru_stime, wall, maxrss)
+
+
+def parse_size(text):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit, scale in (('G', 1 << 30), ('M', 1 << 20), ('K', 1 << 10)):
+        if size >= scale and size % scale == 0:
+            return '{}{}'.format(size // scale, unit)
+    return str(size)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+def write_log(path, size, rng):
+    """A write log of about `size` bytes: an instruction segment from 0 and a data segment far above it."""
+    line_estimate = 30
+    entries = max(2, size // line_estimate)
+    instr = entries * 3 // 4
+    addrs = np.concatenate((np.arange(instr, dtype=np.uint64) * 8,
+                            (1 << 24) + np.arange(entries - instr, dtype=np.uint64) * 8))
+    values = rng.integers(0, 1 << 63, size=entries, dtype=np.uint64)
+    with open(path, 'w') as f:
+        step = 1 << 20
+        for lo in range(0, entries, step):
+            f.write(''.join('memory[%d] <= %016x\n' % av
+                            for av in zip(addrs[lo:lo + step].tolist(), values[lo:lo + step].tolist())))
+
+
+def dump_bin(path, size, rng):
+    """A dump binary: random contents followed by a zero tail, as left by NEMU --dump-mem."""
+    size -= size % 8
+    payload = size * 3 // 4
+    with open(path, 'wb') as f:
+        step = 64 << 20
+        for lo in range(0, payload, step):
+            f.write(rng.integers(0, 256, size=min(step, payload - lo), dtype=np.uint8).tobytes())
+        f.truncate(size)
+
+
+def elf_with_data(path, data_addr, symbol='Init_counter'):
+    """Minimal ELF64 (RISC-V) with a .data section and one global object symbol at its start."""
+    shstrtab = b'\0.data\0.symtab\0.strtab\0.shstrtab\0'
+    strtab = b'\0' + symbol.encode() + b'\0'
+    symtab = struct.pack('<IBBHQQ', 0, 0, 0, 0, 0, 0) + \
+        struct.pack('<IBBHQQ', 1, 0x11, 0, 1, data_addr, 8)
+    data = b'\0' * 8
+    blobs = [data, symtab, strtab, shstrtab]
+    offsets = []
+    offset = 64
+    for blob in blobs:
+        offsets.append(offset)
+        offset += len(blob)
+    shoff = (offset + 7) & ~7
+
+    def shdr(name, kind, flags, addr, idx, link=0, info=0, align=1, entsize=0):
+        return struct.pack('<IIQQQQIIQQ', shstrtab.index(name), kind, flags, addr,
+                           offsets[idx], len(blobs[idx]), link, info, align, entsize)
+
+    headers = (b'\0' * 64 +
+               shdr(b'.data', 1, 3, data_addr, 0, align=8) +
+               shdr(b'.symtab', 2, 0, 0, 1, link=3, info=1, align=8, entsize=24) +
+               shdr(b'.strtab', 3, 0, 0, 2) +
+               shdr(b'.shstrtab', 3, 0, 0, 3))
+    ident = b'\x7fELF' + bytes([2, 1, 1, 0]) + b'\0' * 8
+    ehdr = struct.pack('<16sHHIQQQIHHHHHH', ident, 2, 243, 1, 0, 0, shoff, 0, 64, 0, 0, 64, 5, 4)
+    with open(path, 'wb') as f:
+        f.write(ehdr)
+        for blob in blobs:
+            f.write(blob)
+        f.write(b'\0' * (shoff - offset))
+        f.write(headers)
+
+
+class Workspace:
+    """Synthetic inputs for one size, generated once and reused across iterations."""
+
+    def __init__(self, root, size, seed):
+        self.root = os.path.join(root, format_size(size))
+        self.size = size
+        self.logs = os.path.join(self.root, 'logs')
+        self.dump = os.path.join(self.root, 'dumpfile')
+        self.pristine = os.path.join(self.root, 'pristine')
+        self.dump_pristine = os.path.join(self.pristine, 'interval_0_dumpmem.bin')
+        self.hex = os.path.join(self.root, 'dumptxt')
+        self.out = os.path.join(self.root, 'out')
+        self.elf = os.path.join(self.root, 'bench.elf')
+        self.data_addr = DUMP_BASE + (size // 2 & ~7)
+        self.rng = np.random.default_rng(seed)
+
+    def prepare(self):
+        stamp = os.path.join(self.root, '.ready')
+        if os.path.exists(stamp):
+            return
+        for d in (self.logs, self.dump, self.pristine, self.hex, self.out):
+            os.makedirs(d, exist_ok=True)
+        print('Generating {} inputs in {}...'.format(format_size(self.size), self.root))
+        write_log(os.path.join(self.logs, 'write_log_0.txt'), self.size, self.rng)
+        dump_bin(self.dump_pristine, self.size, self.rng)
+        # hex text is 17/8 the size of the binary it encodes
+        hex_source = os.path.join(self.root, 'hex_source.bin')
+        dump_bin(hex_source, self.size * 8 // 17, self.rng)
+        run_job([sys.executable, os.path.join(MEM_BUILDER, 'hexconv.py'), 'bin2hex',
+                 hex_source, os.path.join(self.hex, 'interval_0_dumpmem.txt')])
+        os.remove(hex_source)
+        elf_with_data(self.elf, self.data_addr)
+        open(stamp, 'w').close()
+
+    def reset_dump(self):
+        """truncate.py edits dumps in place, so every iteration starts from a fresh copy."""
+        shutil.rmtree(self.dump, ignore_errors=True)
+        os.makedirs(self.dump)
+        shutil.copyfile(self.dump_pristine, os.path.join(self.dump, 'interval_0_dumpmem.bin'))
+
+    def reset_out(self):
+        shutil.rmtree(self.out, ignore_errors=True)
+        os.makedirs(self.out)
+
+
+# ---------------------------------------------------------------------------
+# Converters
+# ---------------------------------------------------------------------------
+
+def py(script_dir, script, *args):
+    return [sys.executable, os.path.join(script_dir, script)] + list(args)
+
+
+# name -> (setup(ws), command(ws))
+CONVERTERS = {
+    'processing_log': (
+        lambda ws: None,
+        lambda ws: py(MEM_BUILDER, 'processing_log.py', ws.logs)),
+    'processing_log_new': (
+        lambda ws: None,
+        lambda ws: py(MEM_BUILDER, 'processing_log_new.py', ws.logs)),
+    'bin_to_hex': (
+        lambda ws: ws.reset_out(),
+        lambda ws: py(MEM_BUILDER, 'bin_to_hex.py', ws.dump_pristine, os.path.join(ws.out, 'dump.hex'))),
+    'truncate': (
+        lambda ws: ws.reset_dump(),
+        lambda ws: py(SIMPOINT_SCRIPTS, 'truncate.py', ws.elf, ws.dump)),
+    'bin2txt': (
+        lambda ws: ws.reset_out(),
+        lambda ws: py(SIMPOINT_SCRIPTS, 'bin2txt.py', ws.pristine, ws.out, ws.elf)),
+    'txt2bin': (
+        lambda ws: ws.reset_out(),
+        lambda ws: py(SIMPOINT_SCRIPTS, 'txt2bin.py', ws.hex, ws.out)),
+}
+
+
+def benchmark(ws, name, iterations):
+    setup, command = CONVERTERS[name]
+    runs = []
+    for _ in range(iterations):
+        setup(ws)
+        runs.append(run_job(command(ws)))
+    return {
+        'converter': name,
+        'size': ws.size,
+        'iterations': iterations,
+        'wall_clock_time': median(r.wall_clock_time for r in runs),
+        'user_time': median(r.user_time for r in runs),
+        'system_time': median(r.system_time for r in runs),
+        'maxrss_kib': max(r.maxrss for r in runs),
+        'runs': [r._asdict() for r in runs],
+    }
+
+
+def git_revision():
+    res = subprocess.run(['git', '-C', SOFTWARE, 'rev-parse', '--short', 'HEAD'],
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return res.stdout.decode('utf-8').strip() if res.returncode == 0 else None
+
+
+def compare(results, baseline_file):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    old = {(r['converter'], r['size']): r for r in baseline['results']}
+    print('\nconverter,size,baseline (s),current (s),ratio,baseline RSS (MiB),current RSS (MiB)')
+    for r in results:
+        b = old.get((r['converter'], r['size']))
+        if b is None:
+            continue
+        ratio = r['wall_clock_time'] / b['wall_clock_time'] if b['wall_clock_time'] else float('nan')
+        print('{},{},{:0.3f},{:0.3f},{:0.2f},{:0.1f},{:0.1f}'.format(
+            r['converter'], format_size(r['size']), b['wall_clock_time'], r['wall_clock_time'], ratio,
+            b['maxrss_kib'] / 1024, r['maxrss_kib'] / 1024))
+
+
+def parseargs():
+    parser = argparse.ArgumentParser("Benchmark mem_builder / simpoint_tools converters")
+    parser.add_argument('--sizes', type=str, nargs='+', default=['1M', '16M'],
+                        help='Input sizes, e.g. 1M 64M 1G')
+    parser.add_argument('--converters', type=str, nargs='+', default=list(CONVERTERS),
+                        choices=list(CONVERTERS), help='Converters to run (default: all)')
+    parser.add_argument('--iterations', '-N', type=int, default=3,
+                        help='Number of times to run each benchmark')
+    parser.add_argument('--workdir', type=str, default='bench_work',
+                        help='Where synthetic inputs are generated (reused between runs)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic inputs')
+    parser.add_argument('--output', '-o', type=str, default='bench_converters.json',
+                        help='JSON result file')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Earlier JSON result file to compare against')
+    return parser.parse_args()
+
+
+def main():
+    args = parseargs()
+    results = []
+    for size in map(parse_size, args.sizes):
+        ws = Workspace(args.workdir, size, args.seed)
+        ws.prepare()
+        for name in args.converters:
+            print('Running {} on {}...'.format(name, format_size(size)))
+            result = benchmark(ws, name, args.iterations)
+            print('  {:0.3f} s, {:0.1f} MiB'.format(result['wall_clock_time'], result['maxrss_kib'] / 1024))
+            results.append(result)
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'host': platform.node(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Wrote {}'.format(args.output))
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
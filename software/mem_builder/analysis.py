@@ -1,4 +1,14 @@
+import argparse
+import csv
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import resolve_jobs
+from log_parser import parse_write_log
+
+# 以下字段提取函数既可用于单个 int，也可直接作用于 NumPy 数组
 
 def hexstr_to_int(s):
     return int(s, 16)
@@ -38,46 +48,126 @@ def is_fp_instr_with_dyn_rm(instruction):
         return True
     return False
 
+def frm_write_mask(instrs):
+    """is_write_to_frm 的向量化版本。"""
+    funct3 = get_funct3(instrs)
+    return (get_opcode(instrs) == 0x73) & (get_csr_addr(instrs) == 0x002) & (funct3 >= 0b001) & (funct3 <= 0b011)
+
+def fp_dyn_rm_mask(instrs):
+    """is_fp_instr_with_dyn_rm 的向量化版本。"""
+    return (get_opcode(instrs) == 0x53) & (get_rm_bits(instrs) == 0b111)
+
+def load_instructions(file_path):
+    """读取日志中每个条目的低 32 位指令字，返回 uint32 数组。"""
+    _, values = parse_write_log(file_path, report=False)
+    return (values & np.uint64(0xFFFFFFFF)).astype(np.uint32)  # 取低32位
+
 def analyze_file(file_path):
-    instructions = []
-
-    with open(file_path) as f:
-        for line in f:
-            line = line.strip()
-            if '<=' not in line:
-                continue
-            try:
-                value = int(line.split('<=')[-1].strip(), 16)
-                instr = value & 0xFFFFFFFF  # 取低32位
-                instructions.append(instr)
-            except Exception:
-                continue
-
-    has_frm_write = any(is_write_to_frm(instr) for instr in instructions)
-    has_fp_dyn_rm = any(is_fp_instr_with_dyn_rm(instr) for instr in instructions)
+    instructions = load_instructions(file_path)
 
-    return has_frm_write, has_fp_dyn_rm
+    has_frm_write = bool(frm_write_mask(instructions).any())
+    has_fp_dyn_rm = bool(fp_dyn_rm_mask(instructions).any())
 
-def analyze_logs_directory(log_dir):
-    summary = []
+    return has_frm_write, has_fp_dyn_rm
 
+def _histogram(prefix, fmt, values, minlength):
+    counts = np.bincount(values, minlength=minlength)
+    return {f"{prefix}_{v:{fmt}}": int(counts[v]) for v in np.flatnonzero(counts)}
+
+def scan_file(file_path):
+    """
+    统计单个日志的指令字段分布，返回一行结果（dict）：
+      - opcode / funct3 直方图（所有条目）
+      - rm 直方图（仅 opcode = 0x53 的浮点运算）
+      - CSR 地址直方图（仅 opcode = 0x73 且 funct3 != 0 的 CSR 指令）
+      - frm 写入与动态舍入模式标志
+    """
+    instrs = load_instructions(file_path)
+    opcode = get_opcode(instrs)
+    funct3 = get_funct3(instrs)
+    fp = opcode == 0x53
+    csr = (opcode == 0x73) & (funct3 != 0)
+
+    row = {
+        'path': file_path,
+        'entries': int(instrs.size),
+        'frm_write': int(frm_write_mask(instrs).sum()),
+        'fp_dyn_rm': int(fp_dyn_rm_mask(instrs).sum()),
+    }
+    row['has_frm_write'] = row['frm_write'] > 0
+    row['has_fp_dyn_rm'] = row['fp_dyn_rm'] > 0
+    row.update(_histogram('opcode', '#04x', opcode, 128))
+    row.update(_histogram('funct3', 'd', funct3, 8))
+    row.update(_histogram('rm', 'd', get_rm_bits(instrs[fp]), 8))
+    row.update(_histogram('csr', '#05x', get_csr_addr(instrs[csr]), 4096))
+    return row
+
+def list_files(log_dir):
+    paths = []
     for root, _, files in os.walk(log_dir):
         for file in files:
-            path = os.path.join(root, file)
-            frm, dyn = analyze_file(path)
-            print(f"[{path}] → frm_written: {frm}, fp_dyn_rm: {dyn}")
-            summary.append((path, frm, dyn))
+            paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+def scan_corpus(log_dir, jobs=1):
+    """并行扫描 log_dir 下的所有文件，按路径排序返回每个文件的统计行。"""
+    paths = list_files(log_dir)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(paths) <= 1:
+        return [scan_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(scan_file, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+
+def _column_key(name):
+    prefix, _, value = name.partition('_')
+    return prefix, int(value, 0)
+
+def write_table(rows, output_file):
+    """
+    将所有行写为一张表：.parquet 结尾时用 pandas 写 Parquet，否则写 CSV。
+    直方图列取整个语料中出现过的值的并集，缺失计为 0。
+    """
+    fixed = ['path', 'entries', 'has_frm_write', 'has_fp_dyn_rm', 'frm_write', 'fp_dyn_rm']
+    order = {'opcode': 0, 'funct3': 1, 'rm': 2, 'csr': 3}
+    hist = {key for row in rows for key in row if key not in fixed}
+    columns = fixed + sorted(hist, key=lambda k: (order[_column_key(k)[0]], _column_key(k)[1]))
+    table = [[row.get(col, 0) for col in columns] for row in rows]
+
+    if output_file.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(table, columns=columns).to_parquet(output_file, index=False)
+    else:
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(table)
+    print(f"结果已写入 {output_file}（{len(rows)} 行，{len(columns)} 列）")
+
+def analyze_logs_directory(log_dir, jobs=1, output_file=None):
+    summary = scan_corpus(log_dir, jobs)
+
+    for row in summary:
+        print(f"[{row['path']}] → frm_written: {row['has_frm_write']}, fp_dyn_rm: {row['has_fp_dyn_rm']}")
 
     # 可以加统计
     print("\n=== Summary ===")
     total = len(summary)
-    with_frm = sum(1 for _, f, _ in summary if f)
-    with_dyn = sum(1 for _, _, d in summary if d)
-    both = sum(1 for _, f, d in summary if f and d)
+    with_frm = sum(1 for row in summary if row['has_frm_write'])
+    with_dyn = sum(1 for row in summary if row['has_fp_dyn_rm'])
+    both = sum(1 for row in summary if row['has_frm_write'] and row['has_fp_dyn_rm'])
     print(f"Total files: {total}")
     print(f"Files with frm write: {with_frm}")
     print(f"Files with FP dyn rm: {with_dyn}")
     print(f"Files with both: {both}")
 
-# 示例调用
-analyze_logs_directory('logs')
+    if output_file:
+        write_table(summary, output_file)
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='统计日志语料中的指令字段分布与 FP 舍入模式标志')
+    parser.add_argument('log_dir', nargs='?', default='logs', help='日志目录（默认 logs）')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（<= 0 表示使用全部核心，默认 1）')
+    parser.add_argument('--output', '-o', type=str, default=None, help='结果表路径（.csv 或 .parquet）')
+    args = parser.parse_args()
+    analyze_logs_directory(args.log_dir, args.jobs, args.output)
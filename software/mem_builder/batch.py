@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+mem_builder 的批处理工具：按编号排序日志文件，并可用进程池并行转换。
+
+每个文件的输出先在子进程中捕获，再按文件顺序统一打印，
+因此无论并行度多少，输出文件名与打印顺序都保持确定。
+单个文件出错只记录在报告中，不会中断整个批次。
+"""
+import contextlib
+import glob
+import io
+import os
+import re
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+
+def log_index(filename):
+    """从 write_log_N.txt / write_log_N.bin 中取出编号 N，用于排序。"""
+    m = re.search(r'write_log_(\d+)\.(?:txt|bin)', os.path.basename(filename))
+    return int(m.group(1)) if m else 0
+
+
+def find_logs(folder):
+    """
+    扫描 folder 中所有 write_log_*.txt 与二进制日志 write_log_*.bin，按编号排序返回。
+    同一编号两种都存在时只取二进制日志。
+    """
+    log_files = {}
+    for ext in ('.txt', '.bin'):
+        for log_file in glob.glob(os.path.join(folder, "write_log_*" + ext)):
+            log_files[os.path.splitext(log_file)[0]] = log_file
+    return sorted(log_files.values(), key=log_index)
+
+
+def output_path(folder, log_file, prefix, ext):
+    """write_log_N.txt -> <folder>/<prefix>_N<ext>"""
+    base = os.path.splitext(os.path.basename(log_file))[0]
+    return os.path.join(folder, base.replace("write_log", prefix) + ext)
+
+
+def resolve_jobs(jobs):
+    """jobs <= 0 表示使用全部 CPU 核心。"""
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def run_task(task):
+    """在（子）进程中执行一个任务，返回 (捕获的输出, 错误信息或 None, 返回值)。"""
+    func, args = task
+    buf = io.StringIO()
+    error = None
+    result = None
+    with contextlib.redirect_stdout(buf):
+        try:
+            result = func(*args)
+        except Exception:
+            error = traceback.format_exc().rstrip()
+    return buf.getvalue(), error, result
+
+
+def run_batch(func, tasks, jobs=1):
+    """
+    对每个参数元组执行 func(*args)。
+
+    tasks 为 [(log_file, args), ...]；jobs > 1 时使用进程池。
+    结果按 tasks 顺序打印，返回 (失败列表 [(log_file, 错误信息), ...],
+    按 tasks 顺序排列的返回值列表（失败的任务为 None）)。
+    """
+    jobs = resolve_jobs(jobs)
+    work = [(func, args) for _, args in tasks]
+    if jobs == 1 or len(work) <= 1:
+        results = map(run_task, work)
+        return _report(tasks, results)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(run_task, work, chunksize=max(1, len(work) // (jobs * 4)))
+        return _report(tasks, results)
+
+
+def _report(tasks, results):
+    failures = []
+    values = []
+    for (log_file, _), (output, error, value) in zip(tasks, results):
+        print(output, end='')
+        if error is not None:
+            print(f"[ERROR] 处理 {log_file} 失败：\n{error}")
+            failures.append((log_file, error))
+        values.append(value)
+    return failures, values
+
+
+def print_summary(total, failures):
+    """打印批处理汇总与失败文件列表。"""
+    print(f"\n=== 批处理完成：共 {total} 个文件，成功 {total - len(failures)} 个，失败 {len(failures)} 个 ===")
+    for log_file, error in failures:
+        print(f"  {log_file}: {error.splitlines()[-1]}")
@@ -2,23 +2,15 @@
 import sys
 import os
 
-def bin_to_hex(bin_file, hex_file):
-    with open(bin_file, "rb") as f:
-        data = f.read()
+from hexconv import convert
 
-    # 确保长度是8的倍数（64-bit）
-    if len(data) % 8 != 0:
-        padding = 8 - (len(data) % 8)
-        data += b'\x00' * padding
+def bin_to_hex(bin_file, hex_file):
+    # 整块向量化转换，见 hexconv.py；末尾不足 8 字节时补零（64-bit 对齐）
+    total, padding = convert('bin2hex', bin_file, hex_file)
+    if padding:
         print(f"[INFO] Padding {padding} bytes to align to 8-byte boundary.")
 
-    with open(hex_file, "w") as f:
-        for i in range(0, len(data), 8):
-            word = data[i:i+8]
-            value = int.from_bytes(word, byteorder="little")  # little-endian
-            f.write(f"{value:016x}\n")
-
-    print(f"[SUCCESS] Wrote hex file: {hex_file} ({len(data)} bytes)")
+    print(f"[SUCCESS] Wrote hex file: {hex_file} ({total} bytes)")
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+二进制写日志格式，替代 memory[addr] <= data 文本行。
+
+文件布局（little-endian）：
+  头部   : magic(8s) = b'TFWLOG\\0\\0', version(u32), 记录大小(u32) = 16, 记录数(u64)
+  记录   : 地址(u64), 数据(u64)，按写入顺序排列
+
+记录数为 0 表示未知（例如 FPGA 侧边写边 dump），此时读到文件末尾为止。
+与文本日志相比不需要任何解析，体积约为一半。
+
+用法（将文本日志转换为二进制日志 write_log_N.bin）：
+  python binlog.py <log_folder> [--jobs N] [--remove-text]
+"""
+import argparse
+import os
+import struct
+import sys
+
+import numpy as np
+
+BINLOG_MAGIC = b'TFWLOG\0\0'
+BINLOG_VERSION = 1
+BINLOG_HEADER = struct.Struct('<8sIIQ')
+RECORD_DTYPE = np.dtype([('addr', '<u8'), ('data', '<u8')])
+
+
+def is_binary_log(path):
+    """根据文件头判断是否为二进制写日志。"""
+    with open(path, 'rb') as f:
+        return f.read(len(BINLOG_MAGIC)) == BINLOG_MAGIC
+
+
+def read_binary_log(path):
+    """读取二进制写日志，按写入顺序返回 (addrs, values) 两个 uint64 数组。"""
+    with open(path, 'rb') as f:
+        magic, version, record_size, count = BINLOG_HEADER.unpack(f.read(BINLOG_HEADER.size))
+        if magic != BINLOG_MAGIC:
+            raise ValueError(f"{path} 不是二进制写日志")
+        if version != BINLOG_VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} 的版本 {version} / 记录大小 {record_size} 不受支持")
+        records = np.fromfile(f, dtype=RECORD_DTYPE, count=count if count else -1)
+    if count and records.size != count:
+        raise ValueError(f"{path} 被截断：应有 {count} 条记录，实际 {records.size} 条")
+    return records['addr'].astype(np.uint64), records['data'].astype(np.uint64)
+
+
+def write_binary_log(path, addrs, values):
+    """写出二进制写日志。"""
+    records = np.empty(addrs.size, dtype=RECORD_DTYPE)
+    records['addr'] = addrs
+    records['data'] = values
+    with open(path, 'wb') as f:
+        f.write(BINLOG_HEADER.pack(BINLOG_MAGIC, BINLOG_VERSION, RECORD_DTYPE.itemsize, addrs.size))
+        records.tofile(f)
+
+
+def convert_text_log(log_file, bin_log_file, remove_text=False):
+    """将文本写日志转换为二进制写日志。"""
+    from log_parser import parse_write_log
+    addrs, values = parse_write_log(log_file)
+    write_binary_log(bin_log_file, addrs, values)
+    print(f"转换 {log_file} -> {bin_log_file} ({addrs.size} 条记录)")
+    if remove_text:
+        os.remove(log_file)
+
+
+if __name__ == '__main__':
+    from batch import find_logs, run_batch, print_summary
+
+    parser = argparse.ArgumentParser(description='将 write_log_*.txt 转换为二进制写日志 write_log_*.bin')
+    parser.add_argument('log_folder', type=str, help='日志所在目录')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（<= 0 表示使用全部核心，默认 1）')
+    parser.add_argument('--remove-text', action='store_true', help='转换成功后删除文本日志')
+    args = parser.parse_args()
+
+    text_logs = [f for f in find_logs(args.log_folder) if f.endswith('.txt')]
+    tasks = [(f, (f, os.path.splitext(f)[0] + '.bin', args.remove_text)) for f in text_logs]
+    failures, _ = run_batch(convert_text_log, tasks, args.jobs)
+    print_summary(len(tasks), failures)
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+bin <-> hex 双向转换引擎。
+
+hex 文本格式：每行一个 64 位字，16 位小写十六进制，不带前缀，
+数值为对应 8 字节的 little-endian 解释（与 bin_to_hex.py / txt2bin.py 一致）。
+
+整块数据通过 NumPy '<u8' 视图一次性完成字节序转换和十六进制编解码，
+并按块流式处理，支持 stdin / stdout（路径写作 '-'）。
+
+用法:
+  python hexconv.py bin2hex [input.bin|-] [output.hex|-]
+  python hexconv.py hex2bin [input.hex|-] [output.bin|-]
+"""
+import argparse
+import binascii
+import contextlib
+import sys
+
+import numpy as np
+
+# 每次处理的块大小（字节），bin 方向为 8 的倍数
+CHUNK_SIZE = 8 << 20
+LINE_WIDTH = 17  # 16 位十六进制 + '\n'
+
+
+def encode_words(data):
+    """将长度为 8 的倍数的二进制数据编码为 hex 文本（每 8 字节一行）。"""
+    words = np.frombuffer(data, dtype='<u8')
+    if words.size == 0:
+        return b''
+    # 按大端排列后 hexlify，得到与 f"{value:016x}" 相同的字符顺序
+    digits = np.frombuffer(binascii.hexlify(words.astype('>u8').tobytes()), dtype=np.uint8)
+    lines = np.empty((words.size, LINE_WIDTH), dtype=np.uint8)
+    lines[:, :16] = digits.reshape(-1, 16)
+    lines[:, 16] = ord('\n')
+    return lines.tobytes()
+
+
+def _decode_lines_slow(text):
+    """逐行处理不规整的文本，与 bytes.fromhex(line)[::-1] 的旧实现一致。"""
+    return b''.join(bytes.fromhex(line.strip().decode())[::-1] for line in text.splitlines())
+
+
+def decode_lines(text):
+    """将 hex 文本解码为二进制数据，每行按 little-endian 还原为字节序列。"""
+    if not text:
+        return b''
+    if not text.endswith(b'\n'):
+        text += b'\n'
+    if len(text) % LINE_WIDTH == 0:
+        lines = np.frombuffer(text, dtype=np.uint8).reshape(-1, LINE_WIDTH)
+        if np.all(lines[:, 16] == ord('\n')):
+            try:
+                raw = binascii.unhexlify(lines[:, :16].tobytes())
+            except binascii.Error:
+                pass
+            else:
+                return np.frombuffer(raw, dtype='>u8').astype('<u8').tobytes()
+    return _decode_lines_slow(text)
+
+
+def _read_full(fin, size):
+    """读满 size 字节（管道输入可能一次读不满），文件结束时返回剩余部分。"""
+    parts = []
+    while size > 0:
+        block = fin.read(size)
+        if not block:
+            break
+        parts.append(block)
+        size -= len(block)
+    return b''.join(parts)
+
+
+def bin_to_hex_stream(fin, fout, chunk_size=CHUNK_SIZE):
+    """
+    流式 bin -> hex。末尾不足 8 字节时补零对齐。
+    返回 (处理的总字节数（含补齐）, 补齐的字节数)。
+    """
+    chunk_size -= chunk_size % 8
+    total = 0
+    padding = 0
+    while True:
+        data = _read_full(fin, chunk_size)
+        if not data:
+            break
+        if len(data) % 8:
+            padding = 8 - len(data) % 8
+            data += b'\x00' * padding
+        fout.write(encode_words(data))
+        total += len(data)
+    return total, padding
+
+
+def hex_to_bin_stream(fin, fout, chunk_size=CHUNK_SIZE):
+    """流式 hex -> bin，每块在行边界切分。返回写出的字节数。"""
+    total = 0
+    rest = b''
+    while True:
+        block = fin.read(chunk_size)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        rest = block[cut:]
+        if cut:
+            data = decode_lines(block[:cut])
+            fout.write(data)
+            total += len(data)
+    if rest:
+        data = decode_lines(rest)
+        fout.write(data)
+        total += len(data)
+    return total
+
+
+@contextlib.contextmanager
+def open_stream(path, mode):
+    """打开文件；path 为 '-' 时使用 stdin / stdout 的二进制流。"""
+    if path == '-':
+        stream = sys.stdin.buffer if 'r' in mode else sys.stdout.buffer
+        yield stream
+        if 'w' in mode:
+            stream.flush()
+    else:
+        with open(path, mode) as f:
+            yield f
+
+
+def convert(direction, src='-', dst='-', chunk_size=CHUNK_SIZE):
+    """按 direction（bin2hex / hex2bin）转换 src 到 dst，返回 bin_to_hex_stream / hex_to_bin_stream 的结果。"""
+    streams = {'bin2hex': bin_to_hex_stream, 'hex2bin': hex_to_bin_stream}
+    if direction not in streams:
+        raise ValueError(f"未知的转换方向：{direction}")
+    with open_stream(src, 'rb') as fin, open_stream(dst, 'wb') as fout:
+        return streams[direction](fin, fout, chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bin <-> hex 转换（64 位 little-endian，每行一个字）')
+    parser.add_argument('direction', choices=['bin2hex', 'hex2bin'], help='转换方向')
+    parser.add_argument('input', nargs='?', default='-', help="输入文件，'-' 表示 stdin（默认）")
+    parser.add_argument('output', nargs='?', default='-', help="输出文件，'-' 表示 stdout（默认）")
+    args = parser.parse_args()
+
+    result = convert(args.direction, args.input, args.output)
+    if args.direction == 'bin2hex':
+        total, padding = result
+        if padding:
+            print(f"[INFO] Padding {padding} bytes to align to 8-byte boundary.", file=sys.stderr)
+        print(f"[SUCCESS] {args.input} -> {args.output} ({total} bytes)", file=sys.stderr)
+    else:
+        print(f"[SUCCESS] {args.input} -> {args.output} ({result} bytes)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
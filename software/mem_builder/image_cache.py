@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+内存镜像的内容寻址缓存。
+
+以日志内容的 BLAKE2b 哈希（加上转换方式和镜像格式）作为键，
+命中时直接把缓存中的镜像硬链接（跨文件系统时复制）到输出路径，跳过解析与构建。
+缓存按总字节数做 LRU 淘汰，最近使用时间记录在文件的 mtime 上。
+
+注意：输出文件可能与缓存条目共享 inode，因此转换前总是先删除旧的输出文件，
+避免以 'wb' 打开时截断缓存中的内容。
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+# 修改镜像生成逻辑时递增，使旧缓存自动失效
+CACHE_VERSION = 1
+HASH_BLOCK = 1 << 20
+
+
+def file_digest(path, salt=b''):
+    """流式计算文件内容的 BLAKE2b 摘要。"""
+    h = hashlib.blake2b(salt, digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def link_or_copy(src, dst):
+    """优先创建硬链接，失败时（如跨文件系统）退化为复制。"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ImageCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, log_file, variant):
+        """variant 区分转换方式与镜像格式，例如 'fix/bin'。"""
+        return file_digest(log_file, f"{CACHE_VERSION}/{variant}".encode())
+
+    def entry_path(self, key, ext):
+        return os.path.join(self.cache_dir, key[:2], key + ext)
+
+    def fetch(self, key, ext, output_file):
+        """命中时将缓存镜像链接到 output_file 并刷新其使用时间，返回是否命中。"""
+        entry = self.entry_path(key, ext)
+        if not os.path.exists(entry):
+            return False
+        remove_if_exists(output_file)
+        link_or_copy(entry, output_file)
+        os.utime(entry)
+        return True
+
+    def store(self, key, ext, output_file):
+        """将新生成的镜像放入缓存（先链接到临时文件再原子替换）。"""
+        entry = self.entry_path(key, ext)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix='.tmp')
+        os.close(fd)
+        os.remove(tmp)
+        try:
+            link_or_copy(output_file, tmp)
+            os.replace(tmp, entry)
+        finally:
+            remove_if_exists(tmp)
+
+    def entries(self):
+        """返回 [(mtime, size, path), ...]。"""
+        result = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                result.append((st.st_mtime, st.st_size, path))
+        return result
+
+    def evict(self):
+        """按最近使用时间淘汰，直到缓存总大小不超过 max_bytes。返回淘汰的条目数。"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            remove_if_exists(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+
+def cached_convert(cache, variant, ext, convert, log_file, output_file, *args):
+    """
+    带缓存地执行 convert(log_file, output_file, *args)。
+    返回 'hit' 或 'miss'；cache 为 None 时直接转换并返回 None。
+    """
+    if cache is None:
+        convert(log_file, output_file, *args)
+        return None
+
+    key = cache.key(log_file, variant)
+    if cache.fetch(key, ext, output_file):
+        print(f"缓存命中 {log_file}，复用内存镜像 {output_file}")
+        return 'hit'
+
+    remove_if_exists(output_file)
+    convert(log_file, output_file, *args)
+    if os.path.exists(output_file):
+        cache.store(key, ext, output_file)
+    return 'miss'
+
+
+def print_cache_stats(cache, results):
+    """统计 cached_convert 的返回值并执行一次淘汰。"""
+    hits = sum(1 for r in results if r == 'hit')
+    misses = sum(1 for r in results if r == 'miss')
+    evicted = cache.evict()
+    print(f"缓存：命中 {hits} 次，未命中 {misses} 次，淘汰 {evicted} 个条目")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+内存镜像的几种输出格式：
+
+  bin    : 原有格式，整块 bytearray 写出（最大地址 + 8 字节）。
+  sparse : 内容与 bin 完全相同，但先预分配文件再通过 np.memmap 只写入非零数据，
+           未写入的大段零区在文件系统上保持为稀疏空洞，不占用内存和磁盘。
+  seg    : 紧凑的段列表，每段为 基地址 + 数据；段外区域一律视为 0。
+
+seg 文件格式（little-endian）：
+  头部   : magic(8s) = b'MEMSEG\\0\\0', version(u32), 段数(u32), 镜像大小(u64)
+  每个段 : 基地址(u64), 长度(u64), 数据(长度 字节)
+"""
+import struct
+
+import numpy as np
+
+from log_parser import image_size, resolve_writes, scatter, build_image, write_image
+
+FORMATS = ('bin', 'sparse', 'seg')
+FORMAT_EXT = {'bin': '.bin', 'sparse': '.bin', 'seg': '.seg'}
+
+# 相邻写入之间的零区超过该字节数时断开为新的段
+SEGMENT_GAP = 4096
+
+SEG_MAGIC = b'MEMSEG\0\0'
+SEG_VERSION = 1
+SEG_HEADER = struct.Struct('<8sIIQ')
+SEG_ENTRY = struct.Struct('<QQ')
+
+
+def nonzero_writes(addrs, values):
+    """去重后只保留非零数据；镜像在零初始化的缓冲区上构建，零值无需写入。"""
+    index, data, unit = resolve_writes(addrs, values)
+    mask = data != 0
+    return index[mask], data[mask], unit
+
+
+def write_sparse_image(addrs, values, bin_file):
+    """
+    预分配 bin_file 并通过 np.memmap 散布数据，返回镜像大小。
+    文件内容与 build_image 的结果逐字节一致。
+    """
+    mem_size = image_size(addrs)
+    index, data, unit = nonzero_writes(addrs, values)
+    # 先清空再扩展，扩展出来的部分即为稀疏空洞
+    with open(bin_file, 'wb') as fout:
+        fout.truncate(mem_size)
+    if index.size:
+        mem_image = np.memmap(bin_file, dtype=np.uint8, mode='r+', shape=(mem_size,))
+        scatter(mem_image, index, data, unit)
+        mem_image.flush()
+        del mem_image
+    return mem_size
+
+
+def build_segments(addrs, values, gap=SEGMENT_GAP):
+    """
+    将写操作划分为若干连续段，返回 [(基地址, uint8 数据), ...]（按地址升序）。
+    相邻非零写入之间的零区不超过 gap 字节时合并到同一段中。
+    """
+    index, data, unit = nonzero_writes(addrs, values)
+    if index.size == 0:
+        return []
+    starts = index * np.uint64(unit)
+    breaks = np.flatnonzero(np.diff(starts) > np.uint64(gap + unit)) + 1
+    segments = []
+    for lo, hi in zip(np.r_[0, breaks], np.r_[breaks, index.size]):
+        base = int(starts[lo])
+        length = int(starts[hi - 1]) + unit - base
+        payload = np.zeros(length, dtype=np.uint8)
+        scatter(payload, index[lo:hi] - index[lo], data[lo:hi], unit)
+        segments.append((base, payload))
+    return segments
+
+
+def write_segments(segments, mem_size, seg_file):
+    """写出 seg 文件。"""
+    with open(seg_file, 'wb') as fout:
+        fout.write(SEG_HEADER.pack(SEG_MAGIC, SEG_VERSION, len(segments), mem_size))
+        for base, payload in segments:
+            fout.write(SEG_ENTRY.pack(base, payload.size))
+            fout.write(memoryview(payload))
+
+
+def read_segments(seg_file):
+    """读取 seg 文件，返回 (镜像大小, [(基地址, bytes), ...])。"""
+    with open(seg_file, 'rb') as fin:
+        magic, version, count, mem_size = SEG_HEADER.unpack(fin.read(SEG_HEADER.size))
+        if magic != SEG_MAGIC or version != SEG_VERSION:
+            raise ValueError(f"{seg_file} 不是支持的段列表文件")
+        segments = []
+        for _ in range(count):
+            base, length = SEG_ENTRY.unpack(fin.read(SEG_ENTRY.size))
+            segments.append((base, fin.read(length)))
+    return mem_size, segments
+
+
+def segments_to_image(seg_file):
+    """由 seg 文件还原出与 bin 格式相同的完整镜像（uint8 数组）。"""
+    mem_size, segments = read_segments(seg_file)
+    mem_image = np.zeros(mem_size, dtype=np.uint8)
+    for base, payload in segments:
+        mem_image[base:base + len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+    return mem_image
+
+
+def save_image(addrs, values, output_file, fmt='bin'):
+    """按 fmt 写出镜像，返回用于提示信息的描述字符串。"""
+    if fmt == 'bin':
+        mem_image = build_image(addrs, values)
+        write_image(mem_image, output_file)
+        return f"大小: {mem_image.size} 字节"
+    if fmt == 'sparse':
+        mem_size = write_sparse_image(addrs, values, output_file)
+        return f"大小: {mem_size} 字节, 稀疏"
+    if fmt == 'seg':
+        segments = build_segments(addrs, values)
+        write_segments(segments, image_size(addrs), output_file)
+        payload = sum(p.size for _, p in segments)
+        return f"{len(segments)} 个段, 数据 {payload} 字节"
+    raise ValueError(f"未知的镜像格式：{fmt}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+mem_builder 共用的写日志解析模块。
+
+按大块读取 write_log_*.txt，将 memory[addr] <= data 行批量解码为
+NumPy 数组（地址与 64 位数据均为 uint64），并通过一次向量化赋值
+把数据散布到内存镜像中。输出与逐行 struct.pack 的旧实现逐字节一致。
+二进制写日志（见 binlog.py）会被自动识别。
+"""
+import re
+
+import numpy as np
+
+from binlog import is_binary_log, read_binary_log
+
+# 每次读取的块大小（字节），块尾会回退到最后一个换行符
+CHUNK_SIZE = 16 << 20
+
+# 与旧脚本相同的匹配规则；(?m)^ 让一次 findall 扫完整个块
+LINE_PATTERN = re.compile(rb'(?m)^[ \t\r\f\v]*memory\[(\d+)\][ \t]*<=[ \t]*([0-9A-Fa-f]+)')
+SINGLE_LINE_PATTERN = re.compile(rb'memory\[(\d+)\]\s*<=\s*([0-9A-Fa-f]+)')
+
+# 十六进制字符 -> 半字节值，空字节（S 类型的右侧填充）映射为 0
+_HEX_LUT = np.zeros(256, dtype=np.uint64)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _HEX_LUT[_c] = _i
+for _i, _c in enumerate(b'ABCDEF'):
+    _HEX_LUT[_c] = 10 + _i
+_NIBBLE_SHIFT = np.arange(60, -4, -4, dtype=np.uint64)
+
+
+def iter_chunks(log_file, chunk_size=CHUNK_SIZE):
+    """按块读取文件，每块都以完整行结束。"""
+    rest = b''
+    with open(log_file, 'rb') as fin:
+        while True:
+            block = fin.read(chunk_size)
+            if not block:
+                break
+            block = rest + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                rest = block
+                continue
+            rest = block[cut:]
+            yield block[:cut]
+    if rest:
+        yield rest
+
+
+def decode_hex_words(hex_strs):
+    """将十六进制字节串列表批量解码为 uint64 数组（最多 16 位十六进制）。"""
+    if not hex_strs:
+        return np.zeros(0, dtype=np.uint64)
+    arr = np.array(hex_strs)
+    width = arr.dtype.itemsize
+    if width > 16:
+        raise ValueError(f"数据超过 64 位：{max(hex_strs, key=len).decode()}")
+    digits = arr.view(np.uint8).reshape(-1, width)
+    nibbles = _HEX_LUT[digits]
+    # 左对齐求和后再按实际长度右移，得到与 int(s, 16) 相同的结果
+    values = (nibbles << _NIBBLE_SHIFT[:width]).sum(axis=1, dtype=np.uint64)
+    lengths = np.count_nonzero(digits, axis=1).astype(np.uint64)
+    return values >> (np.uint64(4) * (np.uint64(16) - lengths))
+
+
+def report_unmatched(chunk):
+    """逐行找出块中无法匹配的非空行并打印（仅在计数不一致时调用）。"""
+    for raw in chunk.splitlines():
+        line = raw.strip()
+        if line and not SINGLE_LINE_PATTERN.match(line):
+            print(f"无法匹配行：{line.decode(errors='replace')}")
+
+
+def parse_chunk(chunk, report=True):
+    """解析一个文本块，返回 (addrs, values) 两个 uint64 数组；report 为假时不打印无法匹配的行。"""
+    matches = LINE_PATTERN.findall(chunk)
+    lines = chunk.count(b'\n') + (not chunk.endswith(b'\n'))
+    if report and len(matches) != lines:
+        report_unmatched(chunk)
+    if not matches:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)
+    addr_strs, data_strs = zip(*matches)
+    addrs = np.array(addr_strs).astype(np.uint64)
+    values = decode_hex_words(data_strs)
+    return addrs, values
+
+
+def parse_write_log(log_file, chunk_size=CHUNK_SIZE, report=True):
+    """
+    解析整个写日志文件，按出现顺序返回 (addrs, values)。
+
+    日志行示例：
+      memory[0] <= 1182829300000297
+      memory[8] <= 0000009330529073
+    以 binlog 文件头开头的二进制写日志会被自动识别并直接读取。
+    """
+    if is_binary_log(log_file):
+        return read_binary_log(log_file)
+    addr_parts = []
+    value_parts = []
+    for chunk in iter_chunks(log_file, chunk_size):
+        addrs, values = parse_chunk(chunk, report)
+        addr_parts.append(addrs)
+        value_parts.append(values)
+    if not addr_parts:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)
+    return np.concatenate(addr_parts), np.concatenate(value_parts)
+
+
+def last_write_wins(positions):
+    """返回每个位置最后一次写入的下标（按位置升序），保证重复地址时与顺序写入结果一致。"""
+    rev = positions[::-1]
+    _, first_in_rev = np.unique(rev, return_index=True)
+    return len(positions) - 1 - first_in_rev
+
+
+def image_size(addrs):
+    """内存镜像大小：最大地址 + 8（每条记录为 8 字节）。"""
+    return int(addrs.max()) + 8
+
+
+def resolve_writes(addrs, values):
+    """
+    将写操作整理为按位置升序、去重后的 (index, data, unit)。
+
+    地址全部 8 字节对齐时 unit 为 8，index 为 64 位字下标、data 为 uint64；
+    否则 unit 为 1，按字节展开，重叠部分同样以最后一次写入为准。
+    """
+    if not np.any(addrs & np.uint64(7)):
+        keep = last_write_wins(addrs)
+        return addrs[keep] >> np.uint64(3), values[keep], 8
+
+    positions = (addrs[:, None] + np.arange(8, dtype=np.uint64)).ravel()
+    data = values.astype('<u8').view(np.uint8)
+    keep = last_write_wins(positions)
+    return positions[keep], data[keep], 1
+
+
+def scatter(mem_image, index, data, unit):
+    """把 resolve_writes 的结果一次性散布到 uint8 缓冲区（可以是 np.memmap）。"""
+    view = mem_image.view('<u8') if unit == 8 else mem_image
+    view[index] = data
+
+
+def build_image(addrs, values):
+    """
+    根据 (addrs, values) 生成内存镜像（uint8 数组，大小为最大地址 + 8）。
+    数据按 little-endian 写入；同一地址多次写入时以最后一次为准。
+    """
+    mem_image = np.zeros(image_size(addrs), dtype=np.uint8)
+    scatter(mem_image, *resolve_writes(addrs, values))
+    return mem_image
+
+
+def write_image(mem_image, bin_file):
+    """将内存镜像写入二进制文件。"""
+    with open(bin_file, 'wb') as fout:
+        fout.write(memoryview(mem_image))
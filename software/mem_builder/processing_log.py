@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
-import os
-import re
-import glob
-import struct
+import argparse
 import sys
 
-def process_log_file(log_file, output_file):
+from batch import find_logs, output_path, run_batch, print_summary
+from image_cache import ImageCache, cached_convert, print_cache_stats
+from image_writer import FORMATS, FORMAT_EXT, save_image
+from log_parser import parse_write_log
+
+def process_log_file(log_file, output_file, fmt='bin'):
     """
     处理单个日志文件，将其中的写操作转换为二进制内存镜像文件。
 
@@ -13,77 +15,53 @@ def process_log_file(log_file, output_file):
       memory[0] <= 1182829300000297
       memory[8] <= 0000009330529073
       ...
+    解析与镜像构建由 log_parser 批量完成（little-endian），
+    输出格式见 image_writer（bin / sparse / seg）。
     """
-    # 正则表达式匹配：捕获地址和数据部分
-    pattern = re.compile(r'memory\[(\d+)\]\s*<=\s*([0-9A-Fa-f]+)')
-    max_addr = -1
-    entries = []
-
-    with open(log_file, 'r') as fin:
-        for line in fin:
-            line = line.strip()
-            if not line:
-                continue
-            m = pattern.match(line)
-            if m:
-                addr_str, data_str = m.groups()
-                addr = int(addr_str)
-                value = int(data_str, 16)
-                entries.append((addr, value))
-                if addr > max_addr:
-                    max_addr = addr
-            else:
-                print(f"无法匹配行：{line}")
-
-    if max_addr < 0:
+    addrs, values = parse_write_log(log_file)
+    if addrs.size == 0:
         print(f"文件 {log_file} 中没有匹配的内容，跳过处理。")
         return
 
     # 内存大小：最大地址 + 8（每条记录为8字节）
-    mem_size = max_addr + 8
-    mem_image = bytearray(mem_size)
-
-    # 根据日志内容，将每条记录写入对应地址处（以字节为单位）
-    # 这里采用 little-endian 格式，如果需要 big-endian，请将 '<Q' 改为 '>Q'
-    for addr, value in entries:
-        data_bytes = struct.pack('<Q', value)
-        if addr + 8 <= mem_size:
-            mem_image[addr:addr+8] = data_bytes
-        else:
-            print(f"警告：地址 {addr} 超出内存范围 (mem_size={mem_size})")
+    desc = save_image(addrs, values, output_file, fmt)
+    print(f"处理 {log_file} 完成，生成内存镜像文件：{output_file} ({desc})")
 
-    # 写入二进制文件
-    with open(output_file, 'wb') as fout:
-        fout.write(mem_image)
-    print(f"处理 {log_file} 完成，生成内存镜像文件：{output_file} (大小: {mem_size} 字节)")
-
-def process_all_logs(folder):
+def process_all_logs(folder, jobs=1, fmt='bin', cache=None):
     """
-    扫描 folder 文件夹下所有符合 write_log_*.txt 命名规则的日志文件，
+    扫描 folder 文件夹下所有符合 write_log_*.txt（或二进制日志 write_log_*.bin）命名规则的日志文件，
     按照数字顺序处理，并生成对应的二进制文件 mem_image_*.bin。
+    jobs > 1 时使用进程池并行转换（jobs <= 0 表示使用全部核心），
+    输出顺序不变；单个文件出错只记录在报告中，不影响其余文件。
+    fmt 选择镜像格式（bin / sparse / seg，seg 输出 mem_image_*.seg）。
+    cache 为 ImageCache 时，内容相同的日志直接复用缓存中的镜像。
+    返回失败文件列表。
     """
-    pattern = os.path.join(folder, "write_log_*.txt")
-    log_files = glob.glob(pattern)
+    log_files = find_logs(folder)
     if not log_files:
         print(f"在 {folder} 中未找到匹配的日志文件。")
-        return
-
-    # 按照文件名中的数字排序
-    def sort_key(filename):
-        m = re.search(r'write_log_(\d+)\.txt', os.path.basename(filename))
-        return int(m.group(1)) if m else 0
-
-    log_files.sort(key=sort_key)
+        return []
 
-    for log_file in log_files:
-        # 根据日志文件名生成对应输出文件名
-        base = os.path.splitext(os.path.basename(log_file))[0]
-        output_file = os.path.join(folder, base.replace("write_log", "mem_image") + ".bin")
-        process_log_file(log_file, output_file)
+    # 根据日志文件名生成对应输出文件名
+    ext = FORMAT_EXT[fmt]
+    tasks = [(log_file, (cache, f"raw/{fmt}", ext, process_log_file,
+                         log_file, output_path(folder, log_file, "mem_image", ext), fmt))
+             for log_file in log_files]
+    failures, results = run_batch(cached_convert, tasks, jobs)
+    print_summary(len(tasks), failures)
+    if cache is not None:
+        print_cache_stats(cache, results)
+    return failures
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("用法: python process_log.py <log_folder>")
+    parser = argparse.ArgumentParser(description='将 write_log_*.txt 转换为 mem_image_*.bin')
+    parser.add_argument('log_folder', type=str, help='日志所在目录')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（<= 0 表示使用全部核心，默认 1）')
+    parser.add_argument('--format', choices=FORMATS, default='bin',
+                        help='镜像格式：bin 完整镜像 / sparse 稀疏文件 / seg 段列表（默认 bin）')
+    parser.add_argument('--cache', type=str, default=None, help='镜像缓存目录（按日志内容哈希复用已生成的镜像）')
+    parser.add_argument('--cache-size', type=int, default=4096, help='缓存总大小上限，单位 MiB（默认 4096）')
+    args = parser.parse_args()
+    cache = ImageCache(args.cache, args.cache_size << 20) if args.cache else None
+    if process_all_logs(args.log_folder, args.jobs, args.format, cache):
         sys.exit(1)
-    folder = sys.argv[1]
-    process_all_logs(folder)
@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
-import os
-import re
-import glob
-import struct
+import argparse
 import sys
 
-def fix_log_file(log_file, fix_file):
+import numpy as np
+
+from batch import find_logs, output_path, run_batch, print_summary
+from image_cache import ImageCache, cached_convert, print_cache_stats
+from image_writer import FORMATS, FORMAT_EXT, save_image
+from log_parser import parse_write_log, build_image, write_image
+
+# ecall 尾部补丁中用到的指令：li a0, 0 / li a7, 93 / ecall
+ECALL_FULL_TAIL = ((0x05d00893 << 32) | 0x00000513, 0x0000000000000073)
+ECALL_PARTIAL_HIGH = 0x00000513
+ECALL_PARTIAL_TAIL = (0x00000073 << 32) | 0x05d00893
+
+def fix_entries(addrs, values):
     """
-    读取原始日志文件 write_log_n.txt，解析所有条目，
-    并在指令段末尾补充 ecall 指令（根据要求判断“满”或“部分填充”）。
+    在内存中完成 ecall 尾部补丁，返回按地址排序后的 (addrs, values)。
     
     规则说明：
       - 每行格式为:  memory[地址] <= 数据
@@ -21,132 +29,131 @@ def fix_log_file(log_file, fix_file):
       - 如果高 32 位为 0（部分填充），则修改该条目，填充高 32 位为 00000513，
         并追加一个条目，其内容为高 32 位 00000073、低 32 位 05d00893。
     """
-    pattern = re.compile(r'memory\[(\d+)\]\s*<=\s*([0-9A-Fa-f]+)')
-    entries = []
-    
-    with open(log_file, 'r') as fin:
-        for line in fin:
-            line = line.strip()
-            if not line:
-                continue
-            m = pattern.match(line)
-            if m:
-                addr = int(m.group(1))
-                value = int(m.group(2), 16)
-                entries.append((addr, value))
-            else:
-                print(f"无法匹配行：{line}")
-    
-    if not entries:
-        print(f"文件 {log_file} 中没有匹配的内容，跳过处理。")
-        return
+    # 按地址稳定排序，重复地址保持日志中的先后顺序
+    order = np.argsort(addrs, kind='stable')
+    addrs = addrs[order]
+    values = values[order].copy()
     
-    # 按地址排序
-    entries.sort(key=lambda x: x[0])
+    # 将连续条目视为指令段，第一个间隔大于 8 的位置之后为数据段
+    gaps = np.flatnonzero(np.diff(addrs) > 8)
+    split = int(gaps[0]) + 1 if gaps.size else addrs.size
     
-    # 将连续条目视为指令段，不连续后剩下的为数据段
-    instr_entries = []
-    data_entries = []
-    instr_entries.append(entries[0])
-    for i in range(1, len(entries)):
-        if entries[i][0] - entries[i-1][0] > 8:
-            data_entries = entries[i:]
-            break
-        else:
-            instr_entries.append(entries[i])
+    # 在指令段末尾添加补充条目
+    last_addr = int(addrs[split - 1])
+    last_value = int(values[split - 1])
+    if (last_value >> 32) == 0:
+        # 部分填充：高32位为0，再追加一个条目将后面两条指令拼接成一条
+        values[split - 1] = (ECALL_PARTIAL_HIGH << 32) | last_value
+        extra = [(last_addr + 8, ECALL_PARTIAL_TAIL)]
     else:
-        data_entries = []
-    
-    # 如果存在指令段，则在末尾添加补充条目
-    if instr_entries:
-        last_addr, last_value = instr_entries[-1]
-        if (last_value >> 32) == 0:
-            # 部分填充：高32位为0
-            new_last_value = (0x00000513 << 32) | (last_value & 0xffffffff)
-            instr_entries[-1] = (last_addr, new_last_value)
-            # 追加一个条目：将后面两条指令拼接成一条
-            instr_entries.append((last_addr + 8, (0x00000073 << 32) | 0x05d00893))
-        else:
-            # 满条目：追加两个条目
-            instr_entries.append((last_addr + 8, (0x05d00893 << 32) | 0x00000513))
-            instr_entries.append((last_addr + 16, 0x0000000000000073))
+        # 满条目：追加两个条目
+        extra = [(last_addr + 8, ECALL_FULL_TAIL[0]), (last_addr + 16, ECALL_FULL_TAIL[1])]
+    extra_addrs = np.array([a for a, _ in extra], dtype=np.uint64)
+    extra_values = np.array([v for _, v in extra], dtype=np.uint64)
     
-    # 合并指令段和数据段，按地址排序
-    final_entries = instr_entries + data_entries
-    final_entries.sort(key=lambda x: x[0])
-    
-    # 写出 fix_log 文件，每行格式: memory[地址] <= 数据（16位十六进制，不带前缀）
+    # 合并指令段和数据段，按地址稳定排序（补充条目排在同地址的数据条目之前）
+    final_addrs = np.concatenate((addrs[:split], extra_addrs, addrs[split:]))
+    final_values = np.concatenate((values[:split], extra_values, values[split:]))
+    order = np.argsort(final_addrs, kind='stable')
+    return final_addrs[order], final_values[order]
+
+def write_fix_log(fix_file, addrs, values):
+    """写出 fix_log 文件，每行格式: memory[地址] <= 数据（16位十六进制，不带前缀）"""
     with open(fix_file, 'w') as fout:
-        for addr, value in final_entries:
-            fout.write(f"memory[{addr}] <= {value:016x}\n")
+        fout.writelines(f"memory[{addr}] <= {value:016x}\n"
+                        for addr, value in zip(addrs.tolist(), values.tolist()))
     print(f"生成修正文件 {fix_file}")
 
+def fix_log_file(log_file, fix_file):
+    """
+    读取原始日志文件 write_log_n.txt，解析所有条目，
+    补充 ecall 指令后写出 fix_log_n.txt（规则见 fix_entries）。
+    """
+    addrs, values = parse_write_log(log_file)
+    if addrs.size == 0:
+        print(f"文件 {log_file} 中没有匹配的内容，跳过处理。")
+        return
+    write_fix_log(fix_file, *fix_entries(addrs, values))
+
 def log_to_bin(input_file, bin_file):
     """
     根据修正后的日志文件（fix_log_n.txt）生成内存镜像二进制文件。
     每行格式: memory[地址] <= 数据
     """
-    pattern = re.compile(r'memory\[(\d+)\]\s*<=\s*([0-9A-Fa-f]+)')
-    entries = []
-    
-    with open(input_file, 'r') as fin:
-        for line in fin:
-            line = line.strip()
-            if not line:
-                continue
-            m = pattern.match(line)
-            if m:
-                addr = int(m.group(1))
-                value = int(m.group(2), 16)
-                entries.append((addr, value))
-            else:
-                print(f"无法匹配行：{line}")
-    
-    if not entries:
+    addrs, values = parse_write_log(input_file)
+    if addrs.size == 0:
         print(f"文件 {input_file} 中没有匹配的内容，跳过生成二进制文件。")
         return
     
     # 内存大小：最大地址 + 8
-    max_addr = max(addr for addr, _ in entries)
-    mem_size = max_addr + 8
-    mem_image = bytearray(mem_size)
-    
-    for addr, value in entries:
-        if addr + 8 <= mem_size:
-            mem_image[addr:addr+8] = struct.pack('<Q', value)
-        else:
-            print(f"警告：地址 {addr} 超出内存范围 (mem_size={mem_size})")
+    mem_image = build_image(addrs, values)
+    mem_size = mem_image.size
     
-    with open(bin_file, 'wb') as fout:
-        fout.write(mem_image)
+    write_image(mem_image, bin_file)
     print(f"生成内存镜像二进制文件 {bin_file} (大小: {mem_size} 字节)")
 
-def process_all_logs(folder):
+def process_log_file(log_file, bin_file, fix_file=None, fmt='bin'):
     """
-    扫描 folder 中所有 write_log_*.txt 文件，
-    为每个文件生成 fix_log_*.txt 和 mem_image_*.bin 文件。
+    单遍处理一个日志：解析、补充 ecall、生成内存镜像均在内存中完成，
+    不再经过 fix_log 文本的写出与重新解析。
+    fix_file 不为 None 时额外写出 fix_log 作为调试输出；
+    fmt 为镜像格式（见 image_writer）。
     """
-    pattern = os.path.join(folder, "write_log_*.txt")
-    log_files = glob.glob(pattern)
-    if not log_files:
-        print(f"在 {folder} 中未找到匹配的日志文件。")
+    addrs, values = parse_write_log(log_file)
+    if addrs.size == 0:
+        print(f"文件 {log_file} 中没有匹配的内容，跳过处理。")
         return
+    addrs, values = fix_entries(addrs, values)
+    if fix_file is not None:
+        write_fix_log(fix_file, addrs, values)
     
-    def sort_key(filename):
-        m = re.search(r'write_log_(\d+)\.txt', os.path.basename(filename))
-        return int(m.group(1)) if m else 0
-    log_files.sort(key=sort_key)
+    # 内存大小：最大地址 + 8
+    desc = save_image(addrs, values, bin_file, fmt)
+    print(f"生成内存镜像二进制文件 {bin_file} ({desc})")
+
+def process_all_logs(folder, jobs=1, write_fix_logs=False, fmt='bin', cache=None):
+    """
+    扫描 folder 中所有 write_log_*.txt（或二进制日志 write_log_*.bin）文件，
+    为每个文件生成 mem_image_*.bin 文件；write_fix_logs 为真时
+    同时写出 fix_log_*.txt 供调试。
+    jobs > 1 时使用进程池并行转换（jobs <= 0 表示使用全部核心），
+    输出顺序不变；单个文件出错只记录在报告中，不影响其余文件。
+    fmt 选择镜像格式（bin / sparse / seg，seg 输出 mem_image_*.seg）。
+    cache 为 ImageCache 时，内容相同的日志直接复用缓存中的镜像
+    （写出 fix_log 时不使用缓存）。
+    返回失败文件列表。
+    """
+    log_files = find_logs(folder)
+    if not log_files:
+        print(f"在 {folder} 中未找到匹配的日志文件。")
+        return []
     
-    for log_file in log_files:
-        base = os.path.splitext(os.path.basename(log_file))[0]
-        fix_file = os.path.join(folder, base.replace("write_log", "fix_log") + ".txt")
-        bin_file = os.path.join(folder, base.replace("write_log", "mem_image") + ".bin")
-        fix_log_file(log_file, fix_file)
-        log_to_bin(fix_file, bin_file)
+    # 需要写出 fix_log 调试输出时不走缓存
+    if write_fix_logs:
+        cache = None
+    ext = FORMAT_EXT[fmt]
+    tasks = [(log_file, (cache, f"fix/{fmt}", ext, process_log_file,
+                         log_file,
+                         output_path(folder, log_file, "mem_image", ext),
+                         output_path(folder, log_file, "fix_log", ".txt") if write_fix_logs else None,
+                         fmt))
+             for log_file in log_files]
+    failures, results = run_batch(cached_convert, tasks, jobs)
+    print_summary(len(tasks), failures)
+    if cache is not None:
+        print_cache_stats(cache, results)
+    return failures
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("用法: python process_log.py <log_folder>")
+    parser = argparse.ArgumentParser(description='修正 write_log_*.txt 并转换为 mem_image_*.bin')
+    parser.add_argument('log_folder', type=str, help='日志所在目录')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（<= 0 表示使用全部核心，默认 1）')
+    parser.add_argument('--fix-log', action='store_true', help='同时写出 fix_log_*.txt（调试用）')
+    parser.add_argument('--format', choices=FORMATS, default='bin',
+                        help='镜像格式：bin 完整镜像 / sparse 稀疏文件 / seg 段列表（默认 bin）')
+    parser.add_argument('--cache', type=str, default=None, help='镜像缓存目录（按日志内容哈希复用已生成的镜像）')
+    parser.add_argument('--cache-size', type=int, default=4096, help='缓存总大小上限，单位 MiB（默认 4096）')
+    args = parser.parse_args()
+    cache = ImageCache(args.cache, args.cache_size << 20) if args.cache else None
+    if process_all_logs(args.log_folder, args.jobs, args.fix_log, args.format, cache):
         sys.exit(1)
-    folder = sys.argv[1]
-    process_all_logs(folder)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+mem_builder 的增量监视模式。
+
+常驻监视日志目录，每当 write_log_N.txt（或二进制日志 write_log_N.bin）写完关闭后立即转换为 mem_image_N.*，
+不再在每批 FPGA 运行后重新扫描并转换整个目录。
+
+  - Linux 上通过 inotify（IN_CLOSE_WRITE / IN_MOVED_TO）获得关闭事件；事件队列溢出（IN_Q_OVERFLOW）
+    时可能丢失事件，此时重新扫描整个目录；
+  - 其他平台或 inotify 不可用时退化为轮询：文件大小与 mtime
+    在相邻两次轮询间保持不变即视为已写完。
+
+启动时只转换镜像缺失或比日志旧的文件。每个文件从检测到写完到镜像生成的延迟
+会被记录，并可通过 --stats 以 JSON 形式持续输出（Ctrl-C 退出时打印汇总）。
+
+用法: python watch.py <log_folder> [--jobs N] [--format bin|sparse|seg] [--raw]
+                     [--cache DIR] [--stats stats.json] [--poll 1.0]
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+
+import processing_log
+import processing_log_new
+from batch import find_logs, log_index, output_path, resolve_jobs, run_task
+from image_cache import ImageCache, cached_convert
+from image_writer import FORMATS, FORMAT_EXT
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def is_write_log(name):
+    return name.startswith('write_log_') and name.endswith(('.txt', '.bin'))
+
+
+class InotifyWatcher:
+    """基于 ctypes 调用 libc 的 inotify，不依赖第三方库。"""
+
+    def __init__(self, folder):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or libc_name is None:
+            raise OSError("inotify 不可用")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"无法监视 {folder}")
+        self.folder = folder
+
+    def wait(self, timeout, wake_fd):
+        """
+        等待最多 timeout 秒（wake_fd 可读时提前返回），返回写完关闭的 write_log 文件路径列表；
+        事件队列溢出时返回 None，由调用方重新扫描目录。与 find_logs 一致，同一编号存在 .bin 时不返回 .txt。
+        """
+        ready, _, _ = select.select([self.fd, wake_fd], [], [], timeout)
+        if self.fd not in ready:
+            return []
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        paths = []
+        overflow = False
+        offset = 0
+        while offset < len(buf):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += INOTIFY_EVENT.size
+            name = buf[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif is_write_log(name):
+                path = os.path.join(self.folder, name)
+                if path.endswith('.txt') and os.path.exists(path[:-len('.txt')] + '.bin'):
+                    continue
+                if path not in paths:
+                    paths.append(path)
+        return None if overflow else paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """轮询目录：大小和 mtime 在一个轮询周期内不再变化即视为写完。"""
+
+    def __init__(self, folder, interval):
+        self.folder = folder
+        self.interval = interval
+        self.next_scan = time.monotonic() + interval
+        self.pending = {}
+        self.reported = {}
+
+    def wait(self, timeout, wake_fd):
+        """等待到下一次轮询（wake_fd 可读时提前返回），返回新写完的 write_log 文件路径列表。"""
+        select.select([wake_fd], [], [], max(0.0, min(timeout, self.next_scan - time.monotonic())))
+        if time.monotonic() < self.next_scan:
+            return []
+        self.next_scan = time.monotonic() + self.interval
+        paths = []
+        for log_file in find_logs(self.folder):
+            try:
+                st = os.stat(log_file)
+            except FileNotFoundError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if self.reported.get(log_file) == sig:
+                continue
+            if self.pending.get(log_file) == sig:
+                del self.pending[log_file]
+                self.reported[log_file] = sig
+                paths.append(log_file)
+            else:
+                self.pending[log_file] = sig
+        return paths
+
+    def mark_seen(self, log_file):
+        """启动时已处理（或无需处理）的文件不再上报，除非之后又被改写。"""
+        st = os.stat(log_file)
+        self.reported[log_file] = (st.st_size, st.st_mtime_ns)
+
+    def close(self):
+        pass
+
+
+class LatencyStats:
+    """记录每个文件从检测到写完到镜像生成的延迟（秒）。"""
+
+    def __init__(self, stats_file=None):
+        self.stats_file = stats_file
+        self.records = []
+        self.failures = 0
+
+    def record(self, log_file, latency, ok):
+        if not ok:
+            self.failures += 1
+        self.records.append({'log': log_file, 'latency': latency, 'ok': ok})
+        if self.stats_file:
+            tmp = self.stats_file + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.summary(), f, indent=2)
+            os.replace(tmp, self.stats_file)
+
+    def summary(self):
+        latencies = sorted(r['latency'] for r in self.records)
+        result = {'converted': len(self.records), 'failed': self.failures}
+        if latencies:
+            pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+            result.update({
+                'mean': sum(latencies) / len(latencies),
+                'p50': pick(0.50),
+                'p95': pick(0.95),
+                'max': latencies[-1],
+            })
+        result['recent'] = self.records[-20:]
+        return result
+
+
+def ignore_sigint():
+    """工作进程忽略 Ctrl-C，由主进程统一收尾（需为模块级函数，spawn 方式下才能 pickle）。"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def needs_conversion(log_file, image_file):
+    try:
+        return os.path.getmtime(image_file) < os.path.getmtime(log_file)
+    except FileNotFoundError:
+        return True
+
+
+def make_task(log_file, folder, fmt, raw, cache):
+    """构造与 process_all_logs 相同的转换任务。"""
+    ext = FORMAT_EXT[fmt]
+    image_file = output_path(folder, log_file, "mem_image", ext)
+    if raw:
+        return (cached_convert, (cache, f"raw/{fmt}", ext, processing_log.process_log_file,
+                                 log_file, image_file, fmt))
+    return (cached_convert, (cache, f"fix/{fmt}", ext, processing_log_new.process_log_file,
+                             log_file, image_file, None, fmt))
+
+
+def watch(folder, jobs=1, fmt='bin', raw=False, cache=None, stats_file=None, poll=1.0, use_inotify=True):
+    watcher = None
+    if use_inotify:
+        try:
+            watcher = InotifyWatcher(folder)
+            print(f"使用 inotify 监视 {folder}")
+        except OSError as e:
+            print(f"inotify 不可用（{e}），改为轮询")
+    if watcher is None:
+        watcher = PollingWatcher(folder, poll)
+        print(f"每 {poll} 秒轮询 {folder}")
+
+    stats = LatencyStats(stats_file)
+    pool = ProcessPoolExecutor(max_workers=resolve_jobs(jobs), initializer=ignore_sigint)
+    running = {}
+    # 转换期间再次写完关闭的日志：记下最近一次检测时间，当前转换完成后重新提交
+    dirty = {}
+    # 转换完成时通过管道唤醒主循环，避免完成后还要等到下一个等待周期
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+
+    def submit(log_file, detected):
+        if log_file in running:
+            dirty[log_file] = detected
+            return
+        future = pool.submit(run_task, make_task(log_file, folder, fmt, raw, cache))
+        future.add_done_callback(lambda _: os.write(wake_w, b'.'))
+        running[log_file] = (future, detected)
+
+    def collect():
+        try:
+            os.read(wake_r, 4096)
+        except BlockingIOError:
+            pass
+        done = False
+        for log_file, (future, detected) in sorted(running.items(), key=lambda kv: log_index(kv[0])):
+            if not future.done():
+                continue
+            del running[log_file]
+            output, error, _ = future.result()
+            latency = time.monotonic() - detected
+            print(output, end='')
+            if error is not None:
+                print(f"[ERROR] 处理 {log_file} 失败：\n{error}")
+            print(f"[{os.path.basename(log_file)}] 延迟 {latency * 1000:.1f} ms")
+            stats.record(log_file, latency, error is None)
+            done = True
+            if log_file in dirty:
+                submit(log_file, dirty.pop(log_file))
+        if done and cache is not None:
+            cache.evict()
+
+    def rescan():
+        """补齐尚未转换（或已过期）的日志。"""
+        now = time.monotonic()
+        for log_file in find_logs(folder):
+            if needs_conversion(log_file, output_path(folder, log_file, "mem_image", FORMAT_EXT[fmt])):
+                submit(log_file, now)
+            if isinstance(watcher, PollingWatcher):
+                watcher.mark_seen(log_file)
+
+    rescan()
+    try:
+        while True:
+            paths = watcher.wait(poll, wake_r)
+            if paths is None:
+                print("inotify 事件队列溢出，重新扫描目录")
+                rescan()
+                paths = []
+            for log_file in paths:
+                submit(log_file, time.monotonic())
+            collect()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # 等待进行中的转换，包括完成后因 dirty 重新提交的
+        while running:
+            wait_futures([future for future, _ in running.values()])
+            collect()
+        pool.shutdown(wait=True)
+        watcher.close()
+        os.close(wake_r)
+        os.close(wake_w)
+        summary = stats.summary()
+        summary.pop('recent')
+        print("\n=== 监视结束 ===")
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='监视日志目录，写完即转换为内存镜像')
+    parser.add_argument('log_folder', type=str, help='日志所在目录')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（<= 0 表示使用全部核心，默认 1）')
+    parser.add_argument('--format', choices=FORMATS, default='bin', help='镜像格式（默认 bin）')
+    parser.add_argument('--raw', action='store_true', help='按 processing_log.py 转换（不补充 ecall 尾部）')
+    parser.add_argument('--cache', type=str, default=None, help='镜像缓存目录')
+    parser.add_argument('--cache-size', type=int, default=4096, help='缓存总大小上限，单位 MiB（默认 4096）')
+    parser.add_argument('--stats', type=str, default=None, help='每次转换后更新的延迟统计 JSON 文件')
+    parser.add_argument('--poll', type=float, default=1.0, help='轮询 / 事件等待间隔，单位秒（默认 1.0）')
+    parser.add_argument('--no-inotify', action='store_true', help='强制使用轮询')
+    args = parser.parse_args()
+    cache = ImageCache(args.cache, args.cache_size << 20) if args.cache else None
+    watch(args.log_folder, args.jobs, args.format, args.raw, cache, args.stats, args.poll,
+          not args.no_inotify)
@@ -1,4 +1,7 @@
 import argparse
+import gzip
+
+GZIP_MAGIC = b'\x1f\x8b'
 
 def read_bbvsimpoints(file_path):
     bbvsimpoints = {}
@@ -9,16 +12,79 @@ def read_bbvsimpoints(file_path):
                 bbvsimpoints[index] = simpoint_index
     return bbvsimpoints
 
-def read_simpoint_bbv(file_path):
-    simpoint_bbv = []
-    with open(file_path, 'r') as f:
+def open_bbv(file_path):
+    """
+    打开 BBV 文件，gzip 压缩的 simpoint_bbv.gz 直接流式解压读取，无需先 gunzip。
+    """
+    with open(file_path, 'rb') as f:
+        gzipped = f.read(2) == GZIP_MAGIC
+    return gzip.open(file_path, 'rt') if gzipped else open(file_path, 'r')
+
+def iter_bbv_lines(file_path):
+    """
+    逐行产出 (interval 编号, 基本块编号与计数交替排列的字符串列表)。
+    'T:45:1024 :189:99' -> (i, ['45', '1024', '189', '99'])
+    """
+    with open_bbv(file_path) as f:
+        interval = 0
         for line in f:
             if line.startswith('T:'):
-                line = line[2:].strip()
-                blocks = line.split(' :')
-                bb_dict = {int(bb.split(':')[0]): int(bb.split(':')[1]) for bb in blocks}
-                simpoint_bbv.append(bb_dict)
-    return simpoint_bbv
+                yield interval, line[1:].replace(':', ' ').split()
+                interval += 1
+
+def to_bb_dict(fields):
+    return dict(zip(map(int, fields[0::2]), map(int, fields[1::2])))
+
+def read_simpoint_bbv(file_path):
+    return [to_bb_dict(fields) for _, fields in iter_bbv_lines(file_path)]
+
+def read_bbv_intervals(file_path, intervals):
+    """
+    只解析 intervals 中列出的 interval，返回 {interval: {bb: count}}。
+    读到最后一个需要的 interval 后即停止，其余行不做拆分。
+    """
+    wanted = set(intervals)
+    selected = {}
+    if not wanted:
+        return selected
+    last = max(wanted)
+    for interval, fields in iter_bbv_lines(file_path):
+        if interval in wanted:
+            selected[interval] = to_bb_dict(fields)
+        if interval >= last:
+            break
+    return selected
+
+def read_bbv_matrix(file_path):
+    """
+    将整个 BBV 读成 SciPy CSR 稀疏矩阵，行为 interval，列为基本块编号。
+    同一行中重复出现的基本块计数相加。
+    """
+    import numpy as np
+    from scipy import sparse
+
+    indptr = [0]
+    columns = []
+    for _, fields in iter_bbv_lines(file_path):
+        pairs = np.array(fields, dtype=np.int64)
+        columns.append(pairs)
+        indptr.append(indptr[-1] + pairs.size // 2)
+    pairs = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+    indices = pairs[0::2]
+    data = pairs[1::2]
+    n_cols = int(indices.max()) + 1 if indices.size else 0
+    matrix = sparse.csr_matrix((data, indices, np.array(indptr, dtype=np.int64)),
+                               shape=(len(indptr) - 1, n_cols))
+    matrix.sum_duplicates()
+    return matrix
+
+def save_bbv_npz(file_path, npz_file):
+    from scipy import sparse
+
+    matrix = read_bbv_matrix(file_path)
+    sparse.save_npz(npz_file, matrix)
+    print(f"BBV 稀疏矩阵 {matrix.shape[0]} x {matrix.shape[1]}（{matrix.nnz} 个非零项）已保存到 {npz_file}")
+    return matrix
 
 def read_instmap(file_path):
     instmap = {}
@@ -33,17 +99,17 @@ def read_instmap(file_path):
 
 def process_files(bbvsimpoints_file, simpoint_bbv_file, instmap_file):
     bbvsimpoints = read_bbvsimpoints(bbvsimpoints_file)
-    simpoint_bbv = read_simpoint_bbv(simpoint_bbv_file)
+    simpoint_bbv = read_bbv_intervals(simpoint_bbv_file, bbvsimpoints.values())
     instmap = read_instmap(instmap_file)
-    
+
     results = {}
-    
+
     for index, simpoint_index in bbvsimpoints.items():
-        if simpoint_index < len(simpoint_bbv):
+        if simpoint_index in simpoint_bbv:
             bb_dict = simpoint_bbv[simpoint_index]
             blocks_in_simpoint = {bb_index: instmap.get(bb_index, "Unknown Basic Block") for bb_index in bb_dict}
             results[simpoint_index] = blocks_in_simpoint
-    
+
     return results
 
 def output_results(results, output_file):
@@ -56,14 +122,18 @@ def output_results(results, output_file):
 def main():
     parser = argparse.ArgumentParser(description='Process simpoint and basic block files.')
     parser.add_argument('bbvsimpoints_file', type=str, help='Path to the bbvsimpoints file')
-    parser.add_argument('simpoint_bbv_file', type=str, help='Path to the simpoint_bbv file')
+    parser.add_argument('simpoint_bbv_file', type=str, help='Path to the simpoint_bbv file (plain or gzipped)')
     parser.add_argument('instmap_file', type=str, help='Path to the instmap file')
     parser.add_argument('output_file', type=str, help='Path to the output file')
-    
+    parser.add_argument('--npz', type=str, default=None,
+                        help='Also save the whole BBV as a SciPy CSR matrix (.npz)')
+
     args = parser.parse_args()
 
     results = process_files(args.bbvsimpoints_file, args.simpoint_bbv_file, args.instmap_file)
     output_results(results, args.output_file)
+    if args.npz:
+        save_bbv_npz(args.simpoint_bbv_file, args.npz)
 
 if __name__ == '__main__':
     main()
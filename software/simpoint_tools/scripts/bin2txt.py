@@ -2,24 +2,28 @@ import argparse
 import os
 import glob
 import re
-import subprocess
 import struct
+import sys
 from elftools.elf.elffile import ELFFile
+from elftools.elf.sections import SymbolTableSection
+
+# 共用 mem_builder 中的向量化 hex 转换引擎与进程池批处理
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mem_builder'))
+from batch import run_batch
+from hexconv import encode_words
 
 def get_symbol_address(elf_file, symbol_name):
     """Get the address of a symbol in the ELF file."""
     try:
-        # 使用 readelf 命令来读取符号表
-        result = subprocess.run(['readelf', '-s', elf_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode != 0:
-            raise Exception(f"Error running readelf: {result.stderr}")
-        
-        # 查找符号表中的 Init_counter 符号
-        for line in result.stdout.splitlines():
-            if symbol_name in line:
-                parts = line.split()
-                address = int(parts[1], 16)  # 第二列是符号的地址（16进制）
-                return address
+        # 直接读取 ELF 符号表，按名字精确匹配（不再调用 readelf 做子串匹配）
+        with open(elf_file, 'rb') as f:
+            elffile = ELFFile(f)
+            for section in elffile.iter_sections():
+                if not isinstance(section, SymbolTableSection):
+                    continue
+                symbols = section.get_symbol_by_name(symbol_name)
+                if symbols:
+                    return symbols[0]['st_value']
         raise Exception(f"Symbol {symbol_name} not found in {elf_file}")
     
     except Exception as e:
@@ -35,6 +39,17 @@ def get_data_section_start(elf_file):
                 return section['sh_addr']
     return None
 
+def write_txt_little_endian(binary_data, output_file):
+    """
+    每 8 字节按 little-endian 输出一行十六进制：整 8 字节部分一次性字节序转换并编码，
+    末尾不足 8 字节的部分与原实现相同，按实际字节数倒序输出。
+    """
+    whole = len(binary_data) - len(binary_data) % 8
+    with open(output_file, 'wb') as txt_file:
+        txt_file.write(encode_words(bytes(binary_data[:whole])))
+        if whole < len(binary_data):
+            txt_file.write(bytes(binary_data[whole:])[::-1].hex().encode() + b'\n')
+
 def binary_to_txt_little_endian(input_file, output_file, symbol_address, data_section_start, sequence_number):
     """Modify binary file and convert to text in little-endian format."""
     try:
@@ -55,12 +70,7 @@ def binary_to_txt_little_endian(input_file, output_file, symbol_address, data_se
             raise Exception("Adjusted address is out of range")
 
         # 将修改后的数据写入文本文件
-        with open(output_file, 'w') as txt_file:
-            for i in range(0, len(binary_data), 8):
-                chunk = binary_data[i:i+8]
-                little_endian_chunk = chunk[::-1]  # 转换为小端序
-                hex_chunk = ''.join(f'{byte:02x}' for byte in little_endian_chunk)
-                txt_file.write(hex_chunk + '\n')
+        write_txt_little_endian(binary_data, output_file)
 
         print(f"Successfully converted {input_file} to {output_file} with modifications at adjusted address {adjusted_address}")
 
@@ -73,6 +83,7 @@ def main():
     parser.add_argument('output_directory', type=str, help="Directory to store the output text files")
     parser.add_argument('elf_file', type=str, help="ELF file to extract symbol information")
     parser.add_argument('--symbol', type=str, default="Init_counter", help="Symbol to modify in the binary files (default: Init_counter)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Number of worker processes (<= 0: all cores, default 0)")
 
     args = parser.parse_args()
 
@@ -107,11 +118,13 @@ def main():
     # 按提取的数字进行排序
     numbered_files.sort()
 
-    # 依次处理文件
+    # 在进程池中处理各 interval，序号仍为排序后的位置，输出按文件顺序打印
+    tasks = []
     for index, (number, input_file) in enumerate(numbered_files):
         base = os.path.basename(input_file)
         output_file = os.path.join(args.output_directory, base.replace('.bin', '.txt'))
-        binary_to_txt_little_endian(input_file, output_file, symbol_address, data_section_start, index)
+        tasks.append((input_file, (input_file, output_file, symbol_address, data_section_start, index)))
+    run_batch(binary_to_txt_little_endian, tasks, args.jobs)
 
 if __name__ == "__main__":
     main()
@@ -1,36 +1,29 @@
-import hashlib
-import glob
+import sys
 
-def file_hash(filepath):
-    """ 计算文件的 MD5 哈希值 """
-    hash_md5 = hashlib.md5()
-    with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+from dumpstore import PAGE_SIZE, print_report, scan_dumps
 
-def compare_files(file_directory):
-    """ 对比目录中所有文件的哈希值 """
-    files = list(glob.glob(f"{file_directory}/interval_*_dumpmem.bin"))
-    if not files:
+def compare_files(file_directory, jobs=0):
+    """ 并行计算目录中所有 dump 的 BLAKE2b 哈希并对比，同时报告相邻 interval 的页级差异 """
+    scanned = scan_dumps(file_directory, PAGE_SIZE, jobs)
+    if not scanned:
         print("No files found.")
         return
 
-    file_hashes = {file: file_hash(file) for file in files}
-    all_same = len(set(file_hashes.values())) == 1
+    all_same = len({digest for _, (digest, _, _, _) in scanned}) == 1
 
     if all_same:
         print("All files are identical.")
     else:
         print("Files are not all identical. Different files listed below:")
-        for file, hash_value in file_hashes.items():
+        for file, (hash_value, _, _, _) in scanned:
             print(f"{file}: {hash_value}")
+    print_report(scanned, PAGE_SIZE)
 
 if __name__ == '__main__':
     # 使用文件所在目录路径作为命令行参数
-    import sys
     if len(sys.argv) != 2:
         print("Usage: python script_name.py <bin_files_directory>")
+        print("去重存储与 manifest 见 scripts/dumpstore.py")
         sys.exit(1)
     
     bin_files_directory = sys.argv[1]
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+interval dump 的去重存储。
+
+对目录中的每个 interval_N_dumpmem.bin（进程池并行、按块流式读取）同时计算：
+  - 整个文件的 BLAKE2b 摘要，内容相同的 dump 在存储中只保存一份 blob；
+  - 每个 4 KiB 页的摘要，用于统计相邻 interval 之间变化的页。
+dumpoutput 中每个 dump 的 Init_counter 都被 patch_interval.py 写成了不同的序号，
+因此摘要与 blob 都按该 8 字节清零后的内容计算，序号单独记在 manifest 中，还原时写回即可。
+
+存储布局：
+  <store>/blobs/<摘要前两位>/<摘要>.bin   每种内容一份（复制而非硬链接，dump 之后被原地改写也不影响存储）
+  <store>/manifest.json                  interval -> blob 的映射、Init_counter 的值以及相对上一个 interval 变化的页号
+
+用法: python scripts/dumpstore.py <elf> <bin_files_directory> <store_dir> [--page-size 4096] [--jobs N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import patch_interval
+
+# 共用 mem_builder 中的进程池批处理
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mem_builder'))
+from batch import run_batch
+from image_cache import remove_if_exists
+
+PAGE_SIZE = 4096
+READ_BLOCK = 1 << 20
+MANIFEST = 'manifest.json'
+
+
+def scan_dump(path, page_size=PAGE_SIZE, counter_offset=None):
+    """
+    流式读取一次，返回 (文件摘要, 文件大小, 各页摘要列表, Init_counter)；最后一页可能不满。
+    给出 counter_offset 时摘要按该处 8 字节清零后的内容计算，并返回原来的值，否则计数为 None。
+    """
+    whole = hashlib.blake2b(digest_size=20)
+    pages = []
+    size = 0
+    counter = bytearray(8) if counter_offset is not None else None
+    block_size = READ_BLOCK - READ_BLOCK % page_size
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            if counter is not None and counter_offset < size + len(block) and counter_offset + 8 > size:
+                block = bytearray(block)
+                start, end = max(counter_offset, size), min(counter_offset + 8, size + len(block))
+                counter[start - counter_offset:end - counter_offset] = block[start - size:end - size]
+                block[start - size:end - size] = bytes(end - start)
+            whole.update(block)
+            size += len(block)
+            view = memoryview(block)
+            for offset in range(0, len(block), page_size):
+                pages.append(hashlib.blake2b(view[offset:offset + page_size], digest_size=8).hexdigest())
+    if counter is not None and counter_offset + 8 > size:
+        raise ValueError(f"{path} 大小 0x{size:x} 不足以容纳 Init_counter（偏移 0x{counter_offset:x}）")
+    return whole.hexdigest(), size, pages, int.from_bytes(counter, 'little') if counter is not None else None
+
+
+def changed_pages(prev, pages):
+    """pages 相对 prev 内容不同（或 prev 中没有）的页号。"""
+    return [i for i, digest in enumerate(pages) if i >= len(prev) or prev[i] != digest]
+
+
+def interval_number(path):
+    return int(re.search(r'(\d+)_dumpmem', os.path.basename(path)).group(1))
+
+
+def scan_dumps(folder, page_size=PAGE_SIZE, jobs=0, counter_offset=None):
+    """并行扫描 folder 中的所有 dump，按编号顺序返回 [(路径, (摘要, 大小, 页摘要, Init_counter)), ...]。"""
+    files = patch_interval.interval_dumps(folder)
+    failures, results = run_batch(scan_dump, [(path, (path, page_size, counter_offset)) for path in files], jobs)
+    if failures:
+        raise RuntimeError(f"{len(failures)} 个 dump 读取失败")
+    return list(zip(files, results))
+
+
+def page_deltas(scanned):
+    """按顺序给出每个 dump 相对上一个 dump 变化的页号，第一个 dump 为 None。"""
+    deltas = []
+    prev = None
+    for _, (_, _, pages, _) in scanned:
+        deltas.append(None if prev is None else changed_pages(prev, pages))
+        prev = pages
+    return deltas
+
+
+def blob_path(store_dir, digest):
+    return os.path.join(store_dir, 'blobs', digest[:2], digest + '.bin')
+
+
+def store_blob(store_dir, digest, src, counter_offset=None):
+    """内容不存在时放入存储（先复制到临时文件、清零 Init_counter 再原子替换），返回是否新增。"""
+    entry = blob_path(store_dir, digest)
+    if os.path.exists(entry):
+        return False
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix='.tmp')
+    os.close(fd)
+    os.remove(tmp)
+    try:
+        shutil.copyfile(src, tmp)
+        if counter_offset is not None:
+            with open(tmp, 'r+b') as f:
+                f.seek(counter_offset)
+                f.write(bytes(8))
+        os.replace(tmp, entry)
+    finally:
+        remove_if_exists(tmp)
+    return True
+
+
+def build_store(scanned, store_dir, page_size=PAGE_SIZE, counter_offset=None):
+    """
+    把 scan_dumps 扫描过的 dump 去重存入 store_dir 并写出 manifest，返回 manifest。
+    counter_offset 须与扫描时相同；blob 中该处为 0，各 interval 的值记在 manifest 的 counter 中。
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    deltas = page_deltas(scanned)
+    intervals = []
+    added = 0
+    for (path, (digest, size, pages, counter)), delta in zip(scanned, deltas):
+        added += store_blob(store_dir, digest, path, counter_offset)
+        intervals.append({
+            'interval': interval_number(path),
+            'file': os.path.basename(path),
+            'blob': os.path.relpath(blob_path(store_dir, digest), store_dir),
+            'size': size,
+            'counter': counter,
+            'pages': len(pages),
+            'changed_pages': delta,
+        })
+    manifest = {'page_size': page_size, 'counter_offset': counter_offset, 'intervals': intervals}
+    tmp = os.path.join(store_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+    print(f"新增 {added} 个 blob，manifest 已写入 {os.path.join(store_dir, MANIFEST)}")
+    return manifest
+
+
+def load_manifest(store_dir):
+    with open(os.path.join(store_dir, MANIFEST)) as f:
+        return json.load(f)
+
+
+def print_report(scanned, page_size=PAGE_SIZE):
+    """打印去重统计与相邻 interval 之间的页级差异。"""
+    if not scanned:
+        print("No files found.")
+        return
+    total = sum(size for _, (_, size, _, _) in scanned)
+    unique = {digest: size for _, (digest, size, _, _) in scanned}
+    print(f"{len(scanned)} 个 dump，{len(unique)} 种不同内容："
+          f"原始 {total / 2**20:.2f} MiB，去重后 {sum(unique.values()) / 2**20:.2f} MiB")
+
+    delta_bytes = 0
+    prev_name = None
+    for (path, (_, size, pages, _)), delta in zip(scanned, page_deltas(scanned)):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if delta is None:
+            print(f"  {name}: 基准，{len(pages)} 页")
+            delta_bytes += size
+        else:
+            print(f"  {name}: 与 {prev_name} 相差 {len(delta)} / {len(pages)} 页")
+            delta_bytes += len(delta) * page_size
+        prev_name = name
+    print(f"按 {page_size} 字节页增量传输约 {delta_bytes / 2**20:.2f} MiB（完整传输 {total / 2**20:.2f} MiB）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate interval dumps and report page-level deltas")
+    parser.add_argument('elf_file', type=str, help="ELF file to locate Init_counter (hashed as zero, stored per interval)")
+    parser.add_argument('bin_files_directory', type=str, help="Directory containing interval_*_dumpmem.bin")
+    parser.add_argument('store_dir', type=str, help="Store directory (blobs/ and manifest.json)")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="Page size in bytes (default 4096)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Number of worker processes (<= 0: all cores, default 0)")
+    parser.add_argument('--symbol', type=str, default="Init_counter", help="Per-interval counter symbol (default: Init_counter)")
+    args = parser.parse_args()
+
+    _, counter_offset = patch_interval.counter_offset(args.elf_file, args.symbol)
+    scanned = scan_dumps(args.bin_files_directory, args.page_size, args.jobs, counter_offset)
+    print_report(scanned, args.page_size)
+    build_store(scanned, args.store_dir, args.page_size, counter_offset)
+
+
+if __name__ == '__main__':
+    main()
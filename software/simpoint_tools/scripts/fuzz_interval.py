@@ -1,137 +1,172 @@
+"""
+把所有 Init_data 中的 ra / sp（可选 t4 / pc）改成某个 interval 的值。
+
+interval.py 生成 Interval_init.S 时会写出旁路索引 Interval_init.index.json，记录每个数据表中
+这些槽位所在的行号（blob 模式下为 blob 文件中的字节偏移）及原始值。改写时按索引直接定位，只需
+O(interval 数) 次修改；原始值取自索引，因此对已经改写过的 .S / blob 再次改写结果仍然正确。
+索引缺失或与 .S 对不上时，扫描一遍 .S 重建位置，原始值只能取 .S 中的当前值（须尚未被改写）。
+
+库接口：
+    retarget = IntervalRetarget('Interval_init.S')
+    for idx in retarget.intervals():
+        retarget.retarget(idx)
+        retarget.save()
+
+用法: python scripts/fuzz_interval.py <Interval_init.S> <interval> [--index FILE] [--slots ra sp]
+"""
+import argparse
+import json
+import os
 import re
+import struct
 import sys
 
-def find_corresponding_index(file_path):
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-    
-    index_pair = {}
-    index_pattern = re.compile(r"#\sInterval\s(\d+)")
+from interval import INDEX_SLOTS, index_path
 
-    index_from_zero = 0
-    for line in lines:
-        match = index_pattern.search(line)
-        if match:
-            index = int(match.group(1))
-            index_pair[index] = index_from_zero
-            index_from_zero += 1
-    
-    return index_pair
-
-
-# 获取目标 Init_data_{index} 中的 ra 和 sp 值
-def get_ra_sp_from_target(lines, target_index):
-    ra_pattern = re.compile(r"\.dword\s+(0x[0-9a-fA-F]+)\s+#\s+ra")
-    sp_pattern = re.compile(r"\.dword\s+(0x[0-9a-fA-F]+)\s+#\s+sp")
-    
-    in_target_block = False
-    ra_value, sp_value = None, None
-
-    for line in lines:
-        if f"Init_data_{target_index}:" in line:
-            in_target_block = True
-        
-        if in_target_block:
-            if ra_pattern.search(line):
-                ra_value = ra_pattern.search(line).group(1)
-            elif sp_pattern.search(line):
-                sp_value = sp_pattern.search(line).group(1)
-            
-            if ra_value and sp_value:
-                break
-
-    if not ra_value or not sp_value:
-        raise ValueError(f"Could not find both ra and sp values in Init_data_{target_index}.")
-    
-    return ra_value, sp_value
-
-# 修改所有 Init_data 中的 ra 和 sp 值
-def modify_ra_sp(lines, target_ra, target_sp):
-    ra_pattern = re.compile(r"\.dword\s+0x[0-9a-fA-F]+(\s+#\s+ra)")
-    sp_pattern = re.compile(r"\.dword\s+0x[0-9a-fA-F]+(\s+#\s+sp)")
-
-    new_lines = []
-    for line in lines:
-        if ra_pattern.search(line):
-            line = ra_pattern.sub(f".dword {target_ra}  # ra", line)
-        elif sp_pattern.search(line):
-            line = sp_pattern.sub(f".dword {target_sp}  # sp", line)
-        new_lines.append(line)
-    
-    return new_lines
-
-# 获取目标 Init_interval_{index} 中的 li t4 的机器码
-def get_li_t4_from_target_interval(lines, target_index):
-    li_t4_pattern = re.compile(r"\s+li\s+t4,\s+(0x[0-9a-fA-F]+)")
-
-    in_target_block = False
-    machine_code = None
-    
-    for line in lines:
-        if f"Init_interval_{target_index}:" in line:
-            in_target_block = True
-        
-        if in_target_block:
-            match = li_t4_pattern.search(line)
-            if match:
-                machine_code = match.group(1)
-                break
-    
-    if not machine_code:
-        raise ValueError(f"Could not find 'li t4' instruction in Init_interval_{target_index}.")
-    
-    return machine_code
-
-# 修改所有 Init_interval 中的 li t4 机器码
-def modify_li_t4_in_all_intervals(lines, new_machine_code):
-    li_t4_pattern = re.compile(r"\s+li\s+t4,\s+0x[0-9a-fA-F]+")
-
-    new_lines = []
-    for line in lines:
-        if li_t4_pattern.search(line):
-            # 替换 li t4 指令中的机器码为新的 machine_code
-            line = li_t4_pattern.sub(f"    li t4, {new_machine_code}", line)
-        
-        new_lines.append(line)
-    
-    return new_lines
-
-# 主函数，整合 ra/sp 和 li t4 的修改
-def modify_init_data(file_path, target_index):
-    # 读取原始文件
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-
-    # 获取目标 Init_data_{index} 的 ra 和 sp 值
-    target_ra, target_sp = get_ra_sp_from_target(lines, target_index)
-
-    # 修改所有 Init_data 的 ra 和 sp 值
-    lines = modify_ra_sp(lines, target_ra, target_sp)
-
-    # 获取目标 Init_interval_{index} 中的 li t4 的机器码
-    target_machine_code = get_li_t4_from_target_interval(lines, target_index)
-
-    # 修改所有 Init_interval 中的 li t4 机器码
-    lines = modify_li_t4_in_all_intervals(lines, target_machine_code)
-
-    # 将修改后的内容写回文件
-    with open(file_path, 'w') as file:
-        file.writelines(lines)
+# 原来 choose_idx 改写的槽位
+DEFAULT_SLOTS = ('ra', 'sp')
 
-if __name__ == "__main__":
-    # 检查参数是否正确
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <file_path> <index>")
-        sys.exit(1)
+INTERVAL_PATTERN = re.compile(r"#\sInterval\s(\d+)")
+TABLE_PATTERN = re.compile(r"^(Init_data_\d+|Simpoint_data):")
+SLOT_PATTERN = re.compile(r"\.dword\s+(0x[0-9a-fA-F]+)\s+#\s+(\w+)")
 
-    # 从命令行参数获取文件路径和目标 Init_data 的 index
-    file_path = sys.argv[1]
-    interval_num = int(sys.argv[2])
 
+def scan_index(lines):
+    """
+    扫描一遍 .S，生成与 interval.py 旁路索引相同结构的索引（文本模式）。
+    .S 可能已被改写过，其中的值不能作为原始值，因此不生成 values。
+    """
+    labels = []
+    tables = []
+    for n, line in enumerate(lines):
+        match = INTERVAL_PATTERN.search(line)
+        if match:
+            labels.append(int(match.group(1)))
+            continue
+        match = TABLE_PATTERN.match(line)
+        if match:
+            name = match.group(1)
+            # 第 i 个 "# Interval N" 对应 Init_data_i
+            number = int(name.rsplit('_', 1)[1]) if name.startswith('Init_data_') else None
+            tables.append({'name': name,
+                           'interval': labels[number] if number is not None and number < len(labels) else None,
+                           'slots': {}, 'offsets': {}})
+            count = 0
+            continue
+        match = SLOT_PATTERN.search(line)
+        if match and tables:
+            if match.group(2) in INDEX_SLOTS:
+                tables[-1]['slots'][match.group(2)] = n
+                tables[-1]['offsets'][match.group(2)] = 8 * count
+            count += 1
+    return {'blob': None, 'tables': tables}
+
+
+def index_matches(index, lines):
+    """索引中记录的每一行是否确实是对应寄存器的 .dword。"""
+    for table in index['tables']:
+        for key, n in table['slots'].items():
+            if n >= len(lines):
+                return False
+            match = SLOT_PATTERN.search(lines[n])
+            if not match or match.group(2) != key:
+                return False
+    return True
+
+
+class IntervalRetarget:
+    """
+    载入一次 Interval_init.S（或 blob）及其索引，之后可反复把所有数据表的槽位改为任一 interval 的原始值。
+    原始值取自索引的 values，多次 retarget（包括跨进程的多次 make choose_idx）之间互不影响。
+    """
+
+    def __init__(self, asm_file, index_file=None):
+        self.asm_file = asm_file
+        index_file = index_file or index_path(asm_file)
+        index = None
+        if os.path.exists(index_file):
+            with open(index_file) as f:
+                index = json.load(f)
+
+        self.blob_file = index['blob'] if index is not None else None
+        if self.blob_file is not None:
+            with open(self.blob_file, 'rb') as f:
+                blob = f.read()
+            self.lines = None
+            read = lambda pos: struct.unpack_from('<Q', blob, pos)[0]
+        else:
+            with open(asm_file, 'r') as f:
+                self.lines = f.readlines()
+            if index is None or not index_matches(index, self.lines):
+                index = scan_index(self.lines)
+            read = lambda pos: int(SLOT_PATTERN.search(self.lines[pos]).group(1), 16)
+
+        self.tables = index['tables']
+        if all('values' in table for table in self.tables):
+            self.original = [table['values'] for table in self.tables]
+        else:
+            print(f"Warning: 索引 {index_file} 不可用或没有原始值，改用 {asm_file} 中的当前值（若已改写过则结果不正确）")
+            self.original = [{key: read(pos) for key, pos in table['slots'].items()} for table in self.tables]
+        self.by_interval = {table['interval']: i for i, table in enumerate(self.tables) if table['interval'] is not None}
+        self.pending = {}
+
+    def intervals(self):
+        return list(self.by_interval)
+
+    def values(self, interval_num):
+        """interval 的原始槽位值 {寄存器: 值}。"""
+        if interval_num not in self.by_interval:
+            raise ValueError(f"Interval {interval_num} 不在 {self.asm_file} 中")
+        return dict(self.original[self.by_interval[interval_num]])
+
+    def retarget(self, interval_num, slots=DEFAULT_SLOTS):
+        """把所有数据表的 slots 改为 interval_num 的原始值（只改内存，save() 写回），返回这些值。"""
+        target = self.values(interval_num)
+        missing = [key for key in slots if key not in target]
+        if missing:
+            raise ValueError(f"Init_data_{self.by_interval[interval_num]} 中没有 {', '.join(missing)}")
+        # 其余槽位写回原始值，使上一次 retarget 的修改不残留
+        self.pending = {}
+        for table, original in zip(self.tables, self.original):
+            for key, pos in table['slots'].items():
+                self.pending[pos] = key, target[key] if key in slots else original[key]
+        return {key: target[key] for key in slots}
+
+    def save(self):
+        """把 retarget 的结果写回 .S（整体写一次）或 blob（逐槽位原地写 8 字节，并 touch .S）。"""
+        if self.blob_file is not None:
+            with open(self.blob_file, 'r+b') as f:
+                for pos, (_, value) in self.pending.items():
+                    f.seek(pos)
+                    f.write(struct.pack('<Q', value))
+            # .incbin 不在 -MMD 生成的依赖中，更新 .S 的时间戳使 Interval_init.o 重新汇编
+            os.utime(self.asm_file)
+            return
+        for pos, (key, value) in self.pending.items():
+            self.lines[pos] = f"    .dword {hex(value)}  # {key}\n"
+        with open(self.asm_file, 'w') as f:
+            f.writelines(self.lines)
+
+
+def modify_init_data(file_path, interval_num, index_file=None, slots=DEFAULT_SLOTS):
+    retarget = IntervalRetarget(file_path, index_file)
+    values = retarget.retarget(interval_num, slots)
+    retarget.save()
+    return values
 
-    # 查找所有 Init_data_{index} 的 index 与从 0 开始的 index 的对应关系
-    index_pair = find_corresponding_index(file_path)
-    target_index = index_pair[interval_num]
 
-    # 执行修改操作
-    modify_init_data(file_path, target_index)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Set ra/sp of every Init_data table to the values of one interval')
+    parser.add_argument('file_path', help='Interval_init.S')
+    parser.add_argument('interval', type=int, help='Interval number (as in "# Interval N")')
+    parser.add_argument('--index', default=None, help='Sidecar index (default: <file>.index.json next to the .S)')
+    parser.add_argument('--slots', nargs='+', choices=INDEX_SLOTS, default=list(DEFAULT_SLOTS),
+                        help='Registers to retarget (default: ra sp)')
+    args = parser.parse_args()
+
+    try:
+        values = modify_init_data(args.file_path, args.interval, args.index, args.slots)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(', '.join(f"{key} = {hex(value)}" for key, value in values.items()))
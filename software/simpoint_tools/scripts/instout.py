@@ -1,6 +1,10 @@
+import bisect
 import re
 import sys
 
+BB_PATTERN = re.compile(r'BasicBlockRange: \((0x[0-9a-fA-F]+), (0x[0-9a-fA-F]+)\)')
+INSTR_PATTERN = re.compile(r'^\s*([0-9a-fA-F]+):\s+([0-9a-fA-F]+)\s+(.*)')
+
 def parse_basic_blocks(file_path):
     """
     解析基本块的起始和结束地址。
@@ -8,7 +12,7 @@ def parse_basic_blocks(file_path):
     basic_blocks = []
     with open(file_path, 'r') as file:
         for line in file:
-            match = re.match(r'BasicBlockRange: \((0x[0-9a-fA-F]+), (0x[0-9a-fA-F]+)\)', line)
+            match = BB_PATTERN.match(line)
             if match:
                 start_addr = int(match.group(1), 16)
                 end_addr = int(match.group(2), 16)
@@ -24,7 +28,7 @@ def parse_elf_disassembly(file_path):
     with open(file_path, 'r') as file:
         for line in file:
             # 匹配每条指令的地址、机器码和反汇编信息
-            match = re.match(r'^\s*([0-9a-fA-F]+):\s+([0-9a-fA-F]+)\s+(.*)', line)
+            match = INSTR_PATTERN.match(line)
             if match:
                 addr = int(match.group(1), 16)  # 解析指令地址
                 opcode = match.group(2)         # 指令编码（机器码）
@@ -39,13 +43,22 @@ def parse_elf_disassembly(file_path):
 def map_instructions_to_basic_blocks(basic_blocks, instructions):
     """
     将指令映射到基本块中。
+
+    先把指令按 (地址, 原始序号) 排序，每个基本块 [start, end] 用二分查找
+    定位对应的指令区间，总复杂度 O((B + I) log I)，不再对每个基本块扫描全部指令。
+    基本块之间可以重叠；块内指令保持在反汇编文件中的原始顺序。
     """
+    order = sorted(range(len(instructions)), key=lambda i: (instructions[i][0], i))
+    sorted_addrs = [instructions[i][0] for i in order]
+    # 反汇编通常已按地址递增，此时按地址切片即为原始顺序，无需再排序
+    in_file_order = all(a <= b for a, b in zip(order, order[1:]))
+
     block_instr_map = {}
     for start_addr, end_addr in basic_blocks:
-        block_instr_map[(start_addr, end_addr)] = []
-        for addr, opcode, instr in instructions:
-            if start_addr <= addr <= end_addr:
-                block_instr_map[(start_addr, end_addr)].append((addr, opcode, instr))
+        lo = bisect.bisect_left(sorted_addrs, start_addr)
+        hi = bisect.bisect_right(sorted_addrs, end_addr)
+        indices = order[lo:hi] if in_file_order else sorted(order[lo:hi])
+        block_instr_map[(start_addr, end_addr)] = [instructions[i] for i in indices]
     return block_instr_map
 
 def main(bb_file_path, elf_disassembly_path, output_file_path):
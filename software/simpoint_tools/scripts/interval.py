@@ -1,282 +1,390 @@
-import sys
-
-def parse_riscv_state(file_path):
+import argparse
+import io
+import json
+import os
+
+import numpy as np
+
+# NEMU 输出中各 interval 之间的分隔线
+SEPARATOR = '=' * 69
+
+# 寄存器名称映射
+REGISTER_NAMES = {
+    **{f'x{i}': name for i, name in enumerate([
+        "$0", "ra", "sp", "gp", "tp", "t0", "t1", "t2",
+        "s0", "s1", "a0", "a1", "a2", "a3", "a4", "a5",
+        "a6", "a7", "s2", "s3", "s4", "s5", "s6", "s7",
+        "s8", "s9", "s10", "s11", "t3", "t4", "t5", "t6"
+    ])},
+    **{f'f{i}': name for i, name in enumerate([
+        "ft0", "ft1", "ft2", "ft3", "ft4", "ft5", "ft6", "ft7",
+        "fs0", "fs1", "fa0", "fa1", "fa2", "fa3", "fa4", "fa5",
+        "fa6", "fa7", "fs2", "fs3", "fs4", "fs5", "fs6", "fs7",
+        "fs8", "fs9", "fs10", "fs11", "ft8", "ft9", "ft10", "ft11"
+    ])}
+}
+
+# .interval 段开头的 Init_counter 与 temp_data（4 个 .word）
+COUNTER_BYTES = 16
+DATA_ALIGN = 1 << 9
+DATA_HEADER = (".section .interval,\"aw\",@progbits\n"
+               ".align 3\nInit_counter: .word 0\ntemp_data: .word 0\n .word 0\n .word 0\n\n")
+
+# 旁路索引中记录位置的寄存器，fuzz_interval.py 据此直接改写数据表中的槽位（pc 经 t4 写入 mepc）
+INDEX_SLOTS = ('ra', 'sp', 't4', 'pc')
+
+
+def format_value(value, width):
+    """按 NEMU 原文的十六进制位数（保留前导零）输出，与按原文拷贝的结果一致。"""
+    return f"0x{value:0{width}x}"
+
+
+class IntervalStates:
+    """
+    所有 interval 的寄存器状态：values 每行一个 interval、每列一个寄存器（uint64），
+    present 标记该 interval 是否给出了该寄存器，widths 记录原文的十六进制位数。
+    列按寄存器在文件中首次出现的顺序排列。
+    """
+
+    def __init__(self, labels, columns, values, present, widths):
+        self.labels = labels
+        self.columns = columns
+        self.values = values
+        self.present = present
+        self.widths = widths
+        self._rows = values.tolist()
+        self._present = present.tolist()
+        self._widths = widths.tolist()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def keys(self, i):
+        """第 i 个 interval 给出的寄存器（按列顺序）。"""
+        return tuple(key for key, p in zip(self.columns, self._present[i]) if p)
+
+    def items(self, i):
+        """第 i 个 interval 给出的 (寄存器, 值文本)。"""
+        return [(key, format_value(value, width))
+                for key, value, width, p in zip(self.columns, self._rows[i], self._widths[i], self._present[i]) if p]
+
+    def row(self, i, columns):
+        """第 i 个 interval 中 columns（列下标）对应的值。"""
+        row = self._rows[i]
+        return [row[c] for c in columns]
+
+    def texts(self, i, columns):
+        """第 i 个 interval 中 columns（列下标）对应的值文本。"""
+        row, widths = self._rows[i], self._widths[i]
+        return [format_value(row[c], widths[c]) for c in columns]
+
+
+def iter_interval_records(file_path):
+    """
+    逐行流式读取 NEMU 输出的 interval 状态，按分隔线切分，
+    产出 (interval 编号, {寄存器名: 值文本})；寄存器名已映射为 ABI 名称。
+    """
+    label, items, nonblank = None, {}, False
     with open(file_path, 'r') as file:
-        data = file.read()
-
-    # 寄存器名称映射
-    register_names = {
-        **{f'x{i}': name for i, name in enumerate([
-            "$0", "ra", "sp", "gp", "tp", "t0", "t1", "t2",
-            "s0", "s1", "a0", "a1", "a2", "a3", "a4", "a5",
-            "a6", "a7", "s2", "s3", "s4", "s5", "s6", "s7",
-            "s8", "s9", "s10", "s11", "t3", "t4", "t5", "t6"
-        ])},
-        **{f'f{i}': name for i, name in enumerate([
-            "ft0", "ft1", "ft2", "ft3", "ft4", "ft5", "ft6", "ft7",
-            "fs0", "fs1", "fa0", "fa1", "fa2", "fa3", "fa4", "fa5",
-            "fa6", "fa7", "fs2", "fs3", "fs4", "fs5", "fs6", "fs7",
-            "fs8", "fs9", "fs10", "fs11", "ft8", "ft9", "ft10", "ft11"
-        ])}
-    }
-
-    # 按间隔分割数据
-    intervals = data.split('=====================================================================')
-    parsed_data = []
-
-    for interval in intervals:
-        if interval.strip():
-            interval_data = {}
-            lines = interval.split('\n')
-            for line in lines:
-                if line.strip():
-                    # 特殊处理Interval标号行
-                    if "Interval" in line:
-                        interval_number = line.split()[1]
-                        interval_data['interval'] = interval_number
-                    elif ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip().lower()  # 将键统一为小写
-                        value = value.strip()
-                        # 使用映射表更改寄存器名称
-                        mapped_key = register_names.get(key, key)
-                        if key != "architecture state":  # 排除不需要的数据
-                            interval_data[mapped_key] = value
-            parsed_data.append(interval_data)
-    
-    output_file_path = "output/intermediate.txt"
-    with open(output_file_path, 'w') as output_file:
-        for interval in parsed_data:
-            output_file.write(f'Interval {interval.get("interval")}\n')
-            for key, value in interval.items():
-                if key != "interval":  # 排除Interval标号的重复写入
-                    output_file.write(f'{key}: {value}\n')
-            output_file.write('\n')
-    
-    return parsed_data
-
-
-def generate_riscv_assembly(parsed_data):
-    NUM_SETS = 64
-    ASSOCIATIVITY = 8
-    LINE_SIZE = 64
-
-    assembly_code = [
-        ".section .init",
-        ".globl Init_table",
-        ".globl Simpoint_Phase_Context",
-        "Init_table:",
-        "    la t0, Init_counter",
-        "    lw t1, 0(t0)",
-        "    addi t1, t1, 1",
-        "    sw t1, 0(t0)",
-        "    # Depending on the value of Init_counter, jump to the appropriate interval"
-    ]
-    
-    # 生成跳转逻辑
-    for i in range(len(parsed_data)):
-        assembly_code.append(f"    li t2, {i+1}")
-        assembly_code.append(f"    beq t1, t2, Init_interval_{i}")
-
-    # 生成各个interval的标签和数据初始化
-    data_section = [".section .interval,\"aw\",@progbits", ".align 3\nInit_counter: .word 0\ntemp_data: .word 0\n .word 0\n .word 0\n"]
-    # data_section = [".section .data", ".align 3\nInit_counter: .word 0\ntemp_data: .word 0\n .word 0\n .word 0\n"]
-
-    
-
-
-    
-    for i, interval in enumerate(parsed_data):
-        assembly_code.append(f"# Interval {parsed_data[i].get('interval')}")
-        assembly_code.append(".align 3")
-        assembly_code.append(f"Init_interval_{i}:")
-
-
-
-        # ################################################
-        # # 设置 buffer 指针到 x10
-        # assembly_code.append("    la x10, buffer")
-
-        # # 初始化常量
-        # assembly_code.append(f"    li x14, {NUM_SETS}")
-        # assembly_code.append(f"    li x15, {ASSOCIATIVITY}")
-        # assembly_code.append(f"    li x16, {LINE_SIZE}")
-
-        # # 初始化set
-        # assembly_code.append("    li x11, 0")
-
-        # assembly_code.append("set_loop:\n    bge x11, x14, set_loop_end")
-        
-        # assembly_code.append("    li x12, 0")
-
-        # assembly_code.append("way_loop:\n    bge x12, x15, way_loop_end")
-
-        # # 计算 offset = [(way * NUM_SETS) + set] * LINE_SIZE
-        # assembly_code.append("    mul x17, x12, x14") # x17 = way * NUM_SETS
-        # assembly_code.append("    add x17, x17, x11") # x17 = x17 + set
-        # assembly_code.append("    mul x17, x17, x16") # x17 = x17 * LINE_SIZE
-
-        # # 加载数据
-        # assembly_code.append("    add x17, x10, x17") # x17 = buffer + offset
-        # assembly_code.append("    lb x13, 0(x17)")
-
-        # # way += 1
-        # assembly_code.append("    addi x12, x12, 1")
-        # assembly_code.append("    j way_loop")
-
-        # assembly_code.append("way_loop_end:\n    addi x11, x11, 1")
-        # assembly_code.append("    j set_loop")
-
-        # assembly_code.append("set_loop_end:")
-        # ################################################
-
-        assembly_code.append(f"    la t3, Init_data_{i}  # Load address of Init_data_{i} once")
-        data_section.append(f".align 9\nInit_data_{i}:")
-        
-        offset = 0
-        pc_value = None  # 默认情况下，pc值为空
-
-        t3_offset = 0
-        pc_offset = 0
-
-        for key, value in interval.items():
-            # if key == 'pc':
-            #     pc_value = (value)  # 保存pc值以便使用
-            if key not in ['interval', '$0']:
-                if 'f' in key:
-                    assembly_code.append(f"    fld {key}, {8 * offset}(t3)  # Load {key}")
-                    data_section.append(f"    .dword {value}  # {key}")
-                elif 'm' in key[:2]:
-                    # assembly_code.append(f"    ld t4, {8 * offset}(t3)  # Load {key} to t4")
-                    # assembly_code.append(f"    csrw {key}, t4  # Move from t4 to {key}")
-                    # data_section.append(f"    .dword {value}  # {key}")    
+        for line in file:
+            # 分隔线可能与其他内容在同一行，按分隔线切开后逐段处理
+            pieces = line.split(SEPARATOR) if SEPARATOR in line else (line,)
+            for k, piece in enumerate(pieces):
+                if k > 0:
+                    if nonblank:
+                        yield label, items
+                    label, items, nonblank = None, {}, False
+                if not piece or piece.isspace():
                     continue
-                else:
-                    if(key == "t3"):
-                        # assembly_code.append(f"    la t3, Init_data_{i}  # Load address of Init_data_{i} once again")
-                        data_section.append(f"    .dword {value}  # {key}")
-                        t3_offset = offset
-                        offset += 1
-                        continue
-
-                    if key == 'pc':
-                        pc_value = (value)  # 保存pc值以便使用
-                        pc_offset = offset
-                        offset += 1
-                        data_section.append(f"    .dword {value}  # {key}")
-                        continue
-
-                    assembly_code.append(f"    ld {key}, {8 * offset}(t3)  # Load {key}")
-                    data_section.append(f"    .dword {value}  # {key}")
-                    
-                
-                offset += 1
-        
-        
-
-        
-        if pc_value is not None:
-            assembly_code.append("    sd t4, -80(sp)")
-            # assembly_code.append("    sd t1, -88(sp)")
-            assembly_code.append(f"    ld t4, {8 * pc_offset}(t3)  # Load pc")
-            assembly_code.append("    csrw mepc, t4")
-
-
-            #清除中断后需要再打开mstatus的mie吗
-            # assembly_code.append("    li t4, 0xc200004")
-            # assembly_code.append("    lw t1, 0(t4)")
-            # assembly_code.append("    sw t1, 0(t4)")
-
-            assembly_code.append("    ld t4, -80(sp)")
-            # assembly_code.append("    ld t1, -88(sp)")
+                nonblank = True
+                # 特殊处理Interval标号行
+                if "Interval" in piece:
+                    label = piece.split()[1]
+                elif ':' in piece:
+                    key, value = piece.split(':', 1)
+                    key = key.strip().lower()  # 将键统一为小写
+                    if key != "architecture state":  # 排除不需要的数据
+                        items[REGISTER_NAMES.get(key, key)] = value.strip()
+    if nonblank:
+        yield label, items
 
-            # assembly_code.append("    sd t1, 0(sp)")
-            # assembly_code.append("    sd t0, 8(sp)")
-            # assembly_code.append("    li t1, 0x88")
-            # assembly_code.append("    or t0, t0, t1")
-            # assembly_code.append("    csrw mstatus, t0") 
 
-            # assembly_code.append("    ld t1, 0(sp)")
-            # assembly_code.append("    ld t0, 8(sp)")
-            assembly_code.append(f"    ld t3, {8 * t3_offset}(t3)  # Load t3")
-        
-        assembly_code.append("    mret")  # 添加mret指令
-
-
-
-
-
-
-
-    # 补充Simpoint Phase
-    random_interval = parsed_data[0]
-    assembly_code.append(f"# Simpoint Phase")
-    assembly_code.append(".align 3")
-    assembly_code.append(f"Simpoint_Phase_Context:")
-    assembly_code.append(f"    la t3, Simpoint_data")
-    data_section.append(f".align 9\nSimpoint_data:")
+def parse_riscv_state(file_path):
+    """把 interval 状态文件解析为 IntervalStates。"""
+    labels = []
+    rows = []
+    columns = {}
+    for label, items in iter_interval_records(file_path):
+        row = {}
+        for key, value in items.items():
+            # 值均为十六进制，0x 前缀可有可无
+            digits = value[2:] if value[:2].lower() == '0x' else value
+            try:
+                row[columns.setdefault(key, len(columns))] = int(digits, 16), len(digits)
+            except ValueError:
+                raise ValueError(f"Interval {label}: 无法解析 {key} 的值 {value!r}")
+        labels.append(label)
+        rows.append(row)
+
+    values = np.zeros((len(rows), len(columns)), dtype=np.uint64)
+    widths = np.zeros((len(rows), len(columns)), dtype=np.uint8)
+    present = np.zeros((len(rows), len(columns)), dtype=bool)
+    for i, row in enumerate(rows):
+        if row:
+            index = np.fromiter(row.keys(), dtype=np.int64, count=len(row))
+            values[i, index] = np.fromiter((value for value, _ in row.values()), dtype=np.uint64, count=len(row))
+            widths[i, index] = np.fromiter((width for _, width in row.values()), dtype=np.uint8, count=len(row))
+            present[i, index] = True
+    return IntervalStates(labels, list(columns), values, present, widths)
+
+
+def write_intermediate(states, output_file_path):
+    with open(output_file_path, 'w') as output_file:
+        for i, label in enumerate(states.labels):
+            output_file.write(f'Interval {label}\n')
+            for key, value in states.items(i):
+                output_file.write(f'{key}: {value}\n')
+            output_file.write('\n')
 
 
-    offset = 0
-    pc_value = None  # 默认情况下，pc值为空
+def context_layout(keys):
+    """
+    恢复一组寄存器的指令（不含开头的 la t3，含结尾的 mret），以及数据表中依次存放的寄存器。
+    t3 用作基址、pc 经 t4 写入 mepc，二者的值最后再加载；mxxx CSR 不恢复。
+    """
+    code = []
+    slots = []
     t3_offset = 0
-    pc_offset = 0
-
-    for key, value in random_interval.items():
-        # if key == 'pc':
-        #     pc_value = (value)  # 保存pc值以便使用
-        if key not in ['interval', '$0']:
-            if 'f' in key:
-                assembly_code.append(f"    fld {key}, {8 * offset}(t3)  # Load {key}")
-                data_section.append(f"    .dword {value}  # {key}")
-            elif 'm' in key[:2]:
-                continue
-            else:
-                if(key == "t3"):
-                    # assembly_code.append(f"    la t3, Init_data_{i}  # Load address of Init_data_{i} once again")
-                    data_section.append(f"    .dword {value}  # {key}")
-                    t3_offset = offset
-                    offset += 1
-                    continue
-                if key == 'pc':
-                        pc_value = (value)  # 保存pc值以便使用
-                        pc_offset = offset
-                        offset += 1
-                        data_section.append(f"    .dword {value}  # {key}")
-                        continue
-                assembly_code.append(f"    ld {key}, {8 * offset}(t3)  # Load {key}")
-                data_section.append(f"    .dword {value}  # {key}")
-
-            offset += 1
-        
-    
-        
-    if pc_value is not None:
-        assembly_code.append("    sd t4, -80(sp)")
-        assembly_code.append(f"    ld t4, {8 * pc_offset}(t3)  # Load pc")
-        assembly_code.append("    csrw mepc, t4")
-        assembly_code.append("    ld t4, -80(sp)")
-        assembly_code.append(f"    ld t3, {8 * t3_offset}(t3)  # Load t3")
-    
-    assembly_code.append("    mret")  # 添加mret指令
-    # data_section.append(f".align 4\nbuffer:\n    .space 32768") # 分配32KB的空间供缓存操作使用 -- 0x8000
-    # 结合代码和数据段
-    full_assembly = "\n".join(assembly_code + data_section)
-    with open("output/Interval_init.S", 'w') as output_file:
-        output_file.write(full_assembly)
-        output_file.write("\n")
-
-
-
-
-
-def main(interval_outfile_path):
-    parsed_intervals = parse_riscv_state(interval_outfile_path)
-    generate_riscv_assembly(parsed_intervals)
+    pc_offset = None
+    for key in keys:
+        if key == '$0':
+            continue
+        offset = 8 * len(slots)
+        if 'f' in key:
+            code.append(f"    fld {key}, {offset}(t3)  # Load {key}")
+        elif 'm' in key[:2]:
+            continue
+        elif key == 't3':
+            t3_offset = offset
+        elif key == 'pc':
+            pc_offset = offset
+        else:
+            code.append(f"    ld {key}, {offset}(t3)  # Load {key}")
+        slots.append(key)
+
+    if pc_offset is not None:
+        code.append("    sd t4, -80(sp)")
+        code.append(f"    ld t4, {pc_offset}(t3)  # Load pc")
+        code.append("    csrw mepc, t4")
+        code.append("    ld t4, -80(sp)")
+        code.append(f"    ld t3, {t3_offset}(t3)  # Load t3")
+    code.append("    mret")  # 添加mret指令
+    return "\n".join(code) + "\n", slots
+
+
+class DataSection:
+    """.interval 段的数据表：以 .dword 文本输出，或直接生成二进制 blob 由 .incbin 引入。"""
+
+    def __init__(self, binary):
+        self.binary = binary
+        self.text = io.StringIO()
+        self.text_lines = 0
+        self.blob = bytearray(COUNTER_BYTES)
+        self.symbols = []
+        self.positions = []  # 每个表中 INDEX_SLOTS 的位置：文本为表内行号，二进制为 blob 偏移
+        self.offsets = []  # 每个表中 INDEX_SLOTS 相对表头的字节偏移
+        self.values = []  # 每个表中 INDEX_SLOTS 的原始值（来自 NEMU 状态）
+
+    def table(self, name, values, texts, slots):
+        self.offsets.append({key: 8 * n for n, key in enumerate(slots) if key in INDEX_SLOTS})
+        self.values.append({key: int(value) for value, key in zip(values, slots) if key in INDEX_SLOTS})
+        if self.binary:
+            self.blob.extend(bytes(-len(self.blob) % DATA_ALIGN))
+            self.symbols.append((name, len(self.blob)))
+            start = len(self.blob)
+            self.blob.extend(np.array(values, dtype='<u8').tobytes())
+            self.positions.append({key: start + 8 * n for n, key in enumerate(slots) if key in INDEX_SLOTS})
+        else:
+            self.text.write(f".align 9\n{name}:\n")
+            self.text.writelines(f"    .dword {text}  # {key}\n" for text, key in zip(texts, slots))
+            start = self.text_lines + 2
+            self.positions.append({key: start + n for n, key in enumerate(slots) if key in INDEX_SLOTS})
+            self.text_lines = start + len(slots)
+
+    def assembly(self, blob_file):
+        if not self.binary:
+            return DATA_HEADER + self.text.getvalue()
+        lines = [".section .interval,\"aw\",@progbits",
+                 ".align 9",
+                 "Interval_blob:",
+                 f"    .incbin \"{os.path.abspath(blob_file)}\"",
+                 ".set Init_counter, Interval_blob",
+                 ".set temp_data, Interval_blob + 4"]
+        lines += [f".set {name}, Interval_blob + {offset}" for name, offset in self.symbols]
+        return "\n".join(lines) + "\n"
+
+
+def dispatch_guard(count):
+    """
+    t1 = Init_counter - 1；超出 [0, count) 时与原来的比较链一样落到 Init_interval_0。
+    远处的目标都用 j 跳转，条件分支只跳过一条指令，不依赖汇编器放宽分支范围。
+    """
+    return ["    addi t1, t1, -1",
+            f"    li t2, {count}",
+            "    bltu t1, t2, 1f",
+            "    j Init_interval_0",
+            "1:"]
+
+
+def dispatch_table(count):
+    """
+    以 Init_counter - 1 为下标查跳转表（表项为相对表头的 .word 偏移），常数时间进入 Init_interval_i。
+    """
+    code = dispatch_guard(count) + [
+        "    la t2, Init_jump_table",
+        "    slli t1, t1, 2",
+        "    add t1, t1, t2",
+        "    lw t1, 0(t1)",
+        "    add t1, t1, t2",
+        "    jr t1",
+        ".align 2",
+        "Init_jump_table:"]
+    code += [f"    .word Init_interval_{i} - Init_jump_table" for i in range(count)]
+    return "\n".join(code) + "\n"
+
+
+def dispatch_tree(count):
+    """
+    跳转表的替代方案：对 Init_counter - 1 做平衡二分比较，O(log n) 次分支进入 Init_interval_i，
+    不需要从 .init 段读数据。
+    """
+    code = dispatch_guard(count)
+
+    def node(lo, hi):
+        if lo == hi:
+            code.append(f"    j Init_interval_{lo}")
+            return
+        mid = (lo + hi + 1) // 2
+        code.append(f"    li t2, {mid}")
+        code.append("    bltu t1, t2, 1f")
+        code.append(f"    j .Ldispatch_{mid}_{hi}")
+        code.append("1:")
+        node(lo, mid - 1)
+        code.append(f".Ldispatch_{mid}_{hi}:")
+        node(mid, hi)
+
+    node(0, count - 1)
+    return "\n".join(code) + "\n"
+
+
+DISPATCH = {'table': dispatch_table, 'tree': dispatch_tree}
+
+
+def index_path(asm_path):
+    """Interval_init.S 对应的旁路索引文件。"""
+    return os.path.splitext(asm_path)[0] + '.index.json'
+
+
+def write_index(path, states, data, blob_file, code_lines):
+    """
+    写出旁路索引：每个数据表（Init_data_i 与 Simpoint_data）中 INDEX_SLOTS 各槽位的位置。
+    slots 在文本模式下为 .S 中从 0 开始的行号，blob 模式下为 blob 文件中的字节偏移；
+    offsets 为槽位相对表头的字节偏移，用于在链接后的镜像中定位；
+    values 为各槽位的原始值，.S / 镜像被改写过之后仍可据此恢复。
+    """
+    base = code_lines + DATA_HEADER.count('\n')
+    tables = []
+    for i, (positions, offsets, values) in enumerate(zip(data.positions, data.offsets, data.values)):
+        label = states.labels[i] if i < len(states) else None
+        tables.append({
+            'name': f"Init_data_{i}" if label is not None else "Simpoint_data",
+            'interval': int(label) if label is not None and label.isdigit() else label,
+            'slots': positions if data.binary else {key: base + n for key, n in positions.items()},
+            'offsets': offsets,
+            'values': values,
+        })
+    index = {
+        'blob': os.path.abspath(blob_file) if blob_file is not None else None,
+        'tables': tables,
+    }
+    with open(path, 'w') as f:
+        json.dump(index, f, indent=1)
+
+
+def generate_riscv_assembly(states, output_file_path="output/Interval_init.S", blob_file=None, dispatch='table',
+                            index_file=None):
+    """
+    一次遍历所有 interval，生成 Init_table、各 Init_interval_i 与 Simpoint_Phase_Context，
+    数据表随之写入 .interval 段。指定 blob_file 时数据表写成二进制文件，.S 中只保留符号定义。
+    dispatch 选择 Init_table 按 Init_counter 分派的方式：table（跳转表）或 tree（二分比较）。
+    指定 index_file 时同时写出 ra/sp/t4/pc 槽位的旁路索引，供 fuzz_interval.py 直接定位。
+    """
+    if len(states) == 0:
+        raise ValueError("没有解析到任何 interval")
+
+    data = DataSection(blob_file is not None)
+    layouts = {}  # 寄存器组合相同的 interval 共用同一段恢复代码
+
+    with io.StringIO() as output_file:
+        output_file.write(
+            ".section .init\n"
+            ".globl Init_table\n"
+            ".globl Simpoint_Phase_Context\n"
+            "Init_table:\n"
+            "    la t0, Init_counter\n"
+            "    lw t1, 0(t0)\n"
+            "    addi t1, t1, 1\n"
+            "    sw t1, 0(t0)\n"
+            "    # Depending on the value of Init_counter, jump to the appropriate interval\n")
+
+        # 生成跳转逻辑
+        output_file.write(DISPATCH[dispatch](len(states)))
+
+        # 生成各个interval的标签和数据初始化
+        for i, label in enumerate(states.labels):
+            keys = states.keys(i)
+            if keys not in layouts:
+                code, slots = context_layout(keys)
+                layouts[keys] = code, slots, [states.columns.index(key) for key in slots]
+            code, slots, slot_columns = layouts[keys]
+            output_file.write(f"# Interval {label}\n.align 3\nInit_interval_{i}:\n"
+                              f"    la t3, Init_data_{i}  # Load address of Init_data_{i} once\n")
+            output_file.write(code)
+            data.table(f"Init_data_{i}", states.row(i, slot_columns), states.texts(i, slot_columns), slots)
+
+        # 补充Simpoint Phase，使用第一个 interval 的状态
+        code, slots = context_layout(states.keys(0))
+        output_file.write("# Simpoint Phase\n.align 3\nSimpoint_Phase_Context:\n    la t3, Simpoint_data\n")
+        output_file.write(code)
+        simpoint_columns = [states.columns.index(key) for key in slots]
+        data.table("Simpoint_data", states.row(0, simpoint_columns), states.texts(0, simpoint_columns), slots)
+
+        text = output_file.getvalue()
+
+    with open(output_file_path, 'w') as f:
+        f.write(text)
+        f.write(data.assembly(blob_file))
+
+    if blob_file is not None:
+        with open(blob_file, 'wb') as f:
+            f.write(data.blob)
+    if index_file is not None:
+        write_index(index_file, states, data, blob_file, text.count('\n'))
+
+
+def main(interval_outfile_path, blob_file=None, dispatch='table'):
+    states = parse_riscv_state(interval_outfile_path)
+    write_intermediate(states, "output/intermediate.txt")
+    generate_riscv_assembly(states, "output/Interval_init.S", blob_file, dispatch,
+                            index_path("output/Interval_init.S"))
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python3 script.py <interval_file>")
-        sys.exit(1)
-    main(sys.argv[1])
+    parser = argparse.ArgumentParser(description='Generate output/Interval_init.S from the NEMU interval state file')
+    parser.add_argument('interval_file', type=str, help='interval_init.txt written by NEMU')
+    parser.add_argument('--blob', type=str, default=None,
+                        help='Write the .interval data tables to this binary file and .incbin it instead of .dword lines')
+    parser.add_argument('--dispatch', choices=sorted(DISPATCH), default='table',
+                        help='How Init_table selects the interval: indexed jump table (default) or binary compare tree')
+    args = parser.parse_args()
+    main(args.interval_file, args.blob, args.dispatch)
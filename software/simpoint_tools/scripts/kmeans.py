@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+SimPoint 聚类的 Python 实现，可替代 bin/simpoint（analysiscode/KMeans.cpp）。
+
+流程与 SimPoint 3.2 相同：每个 interval 的 BBV 按总和归一化后随机投影到 -dim 维，
+对每个 k 做 -numInitSeeds 次 k-means，取 BIC 最高的一次，再按 BIC 阈值选出最小的
+合格 k，输出格式相同的 simpoints / weights 文件。
+
+与 C++ 版本的区别：
+  - BBV 只读取一次（支持文本、gzip 以及 analyse.py --npz 生成的 CSR 矩阵），
+    之后所有 k 都在内存中的投影矩阵上计算；
+  - 各个 (k, 初始化种子) 的 k-means 在进程池中并行执行；
+  - -search full 在 1..maxK 上完整扫描（等价于 bin/simpoint -k 1:maxK），
+    -search binary 与 bin/simpoint 默认的 "-k search" 二分搜索一致；
+  - 初始化默认使用 k-means++，-initkm samp / ff 与 C++ 版本使用同一个随机数
+    发生器（Numerical Recipes ran2）和种子，可直接与 bin/simpoint 的结果对比。
+
+用法:
+  python kmeans.py -loadFVFile simpoint_bbv.gz -maxK 60 -saveSimpoints simpoints \\
+                   -saveSimpointWeights weights [-jobs N] [-search full|binary]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analyse import read_bbv_matrix
+
+DEFAULT_KMEANS_ITERATIONS = 100
+DEFAULT_DIMENSIONS = 15
+DEFAULT_RANDSEED_KMEANS_INIT = 493575226
+DEFAULT_RANDSEED_PROJECTION = 2042712918
+DEFAULT_NUM_INIT_SEEDS = 5
+DEFAULT_BIC_THRESHOLD = 0.9
+INIT_TYPES = ('kmeans++', 'samp', 'ff')
+DISTANCE_CHUNK = 4096
+
+INT_MAX = 2147483647
+IM1, IM2 = 2147483563, 2147483399
+AM = 1.0 / IM1
+IMM1 = IM1 - 1
+IA1, IA2 = 40014, 40692
+IQ1, IQ2 = 53668, 52774
+IR1, IR2 = 12211, 3791
+NTAB = 32
+NDIV = 1 + IMM1 // NTAB
+RNMX = 1.0 - 1.2e-7
+# KMeans::bicScore 中使用的 PI
+PI = 3.14159265358979
+
+
+class Random:
+    """与 analysiscode/Utilities.cpp 中的 Random（ran2）逐位一致的随机数发生器。"""
+
+    def __init__(self, seed=0):
+        self.state = -seed if seed > 1 else seed
+        self.idum2 = 123456789
+        self.iy = 0
+        self.iv = [0] * NTAB
+
+    def rand_float(self):
+        if self.state <= 0:
+            self.state = 1 if -self.state < 1 else -self.state
+            self.idum2 = self.state
+            for j in range(NTAB + 7, -1, -1):
+                k = self.state // IQ1
+                self.state = IA1 * (self.state - k * IQ1) - k * IR1
+                if self.state < 0:
+                    self.state += IM1
+                if j < NTAB:
+                    self.iv[j] = self.state
+            self.iy = self.iv[0]
+        k = self.state // IQ1
+        self.state = IA1 * (self.state - k * IQ1) - k * IR1
+        if self.state < 0:
+            self.state += IM1
+        k = self.idum2 // IQ2
+        self.idum2 = IA2 * (self.idum2 - k * IQ2) - k * IR2
+        if self.idum2 < 0:
+            self.idum2 += IM2
+        j = self.iy // NDIV
+        self.iy = self.iv[j] - self.idum2
+        self.iv[j] = self.state
+        if self.iy < 1:
+            self.iy += IMM1
+        temp = np.float32(AM * self.iy)
+        return np.float32(RNMX) if temp > RNMX else temp
+
+    def rand_int(self):
+        return int(self.rand_float() * np.float32(INT_MAX))
+
+
+def random_projection_matrix(seed, rows, cols):
+    rand = Random(seed)
+    values = np.array([rand.rand_float() for _ in range(rows * cols)], dtype=np.float32)
+    return values.astype(np.float64).reshape(rows, cols) * 2.0 - 1.0
+
+
+def load_vectors(fv_file, dim, seed):
+    """读取 BBV，每行按总和归一化后投影到 dim 维，返回 (n, dim) 数组。"""
+    if fv_file.endswith('.npz'):
+        from scipy import sparse
+        matrix = sparse.load_npz(fv_file).tocsr()
+    else:
+        matrix = read_bbv_matrix(fv_file)
+    if matrix.shape[1] and matrix[:, 0].nnz:
+        raise ValueError(f"{fv_file} 中存在编号为 0 的基本块（SimPoint 要求从 1 开始）")
+    row_sums = np.asarray(matrix.sum(axis=1)).ravel().astype(np.float64)
+    normalized = matrix.astype(np.float64).multiply(1.0 / row_sums[:, None]).tocsr()
+    num_dims = matrix.shape[1] - 1
+    projection = np.zeros((num_dims + 1, dim))
+    projection[1:] = random_projection_matrix(seed, num_dims, dim)
+    return np.asarray(normalized @ projection)
+
+
+def nearest_centers(data, centers):
+    """返回每个点最近的中心编号以及距离的平方。"""
+    labels = np.empty(len(data), dtype=np.int64)
+    dist2 = np.empty(len(data))
+    for start in range(0, len(data), DISTANCE_CHUNK):
+        diff = data[start:start + DISTANCE_CHUNK, None, :] - centers[None, :, :]
+        d2 = np.einsum('ijk,ijk->ij', diff, diff)
+        chunk_labels = d2.argmin(axis=1)
+        labels[start:start + len(chunk_labels)] = chunk_labels
+        dist2[start:start + len(chunk_labels)] = d2[np.arange(len(chunk_labels)), chunk_labels]
+    return labels, dist2
+
+
+def initial_centers(init_type, seed, data, weights, k):
+    if init_type == 'samp':
+        rand = Random(seed)
+        return data[[rand.rand_int() % len(data) for _ in range(k)]].copy()
+    if init_type == 'ff':
+        rand = Random(seed)
+        centers = [data[rand.rand_int() % len(data)]]
+        distances = None
+        for _ in range(1, k):
+            d = ((data - centers[-1]) ** 2).sum(axis=1)
+            distances = d if distances is None else np.minimum(distances, d)
+            centers.append(data[distances.argmax()])
+        return np.array(centers)
+    # k-means++：按 (点权重 × 到最近中心距离平方) 的概率依次选取中心
+    rng = np.random.default_rng(seed)
+    p = weights / weights.sum()
+    centers = [data[rng.choice(len(data), p=p)]]
+    distances = ((data - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        score = weights * distances
+        total = score.sum()
+        index = rng.choice(len(data), p=score / total) if total > 0 else rng.choice(len(data), p=p)
+        centers.append(data[index])
+        distances = np.minimum(distances, ((data - data[index]) ** 2).sum(axis=1))
+    return np.array(centers)
+
+
+def run_kmeans(data, weights, centers, max_iterations):
+    """
+    带权 k-means，返回 (中心, 每个中心的权重)。
+    空簇的中心置零；迭代次数用尽时与 KMeans::runKMeans 一样返回倒数第二次的结果。
+    """
+    k = len(centers)
+    current = (centers, np.full(k, 1.0 / k))
+    previous = current
+    for _ in range(max_iterations):
+        labels, _ = nearest_centers(data, current[0])
+        center_weights = np.bincount(labels, weights, minlength=k)
+        new_centers = np.zeros_like(current[0])
+        for d in range(data.shape[1]):
+            new_centers[:, d] = np.bincount(labels, data[:, d] * weights, minlength=k)
+        nonempty = center_weights > 0
+        new_centers[nonempty] /= center_weights[nonempty, None]
+        if np.array_equal(new_centers, current[0]):
+            return new_centers, center_weights
+        previous, current = current, (new_centers, center_weights)
+    return previous
+
+
+def bic_score(data, weights, centers, center_weights):
+    """与 KMeans::bicScore 相同的 BIC 计算。"""
+    n, dim = data.shape
+    labels, dist2 = nearest_centers(data, centers)
+    total_weight = weights.sum()
+    distortion = (dist2 * weights).sum() / (total_weight / n)
+    sigma2 = distortion / (dim * n)
+    with np.errstate(divide='ignore'):
+        likelihood = -dim * (math.log(2.0 * PI * sigma2) + 1) / 2.0 if sigma2 > 0 else -math.inf
+        likelihood -= math.log(total_weight)
+        cw = center_weights[labels]
+        nonempty = cw > 0
+        likelihood += (np.log(cw[nonempty]) * weights[nonempty] / total_weight).sum()
+    likelihood *= n
+    num_parameters = (len(centers) - 1) + len(centers) * dim + 1
+    return likelihood - num_parameters / 2.0 * math.log(n)
+
+
+_data = None
+_weights = None
+
+
+def _init_worker(data, weights):
+    global _data, _weights
+    _data = data
+    _weights = weights
+
+
+def run_trial(task):
+    """执行一次 (k, 初始化种子) 的 k-means，返回 (中心, 中心权重, BIC)。"""
+    k, init_type, seed, max_iterations = task
+    centers = initial_centers(init_type, seed, _data, _weights, k)
+    centers, center_weights = run_kmeans(_data, _weights, centers, max_iterations)
+    return centers, center_weights, bic_score(_data, _weights, centers, center_weights)
+
+
+class Clusterer:
+    def __init__(self, data, args):
+        self.data = data
+        self.weights = np.full(len(data), 1.0 / len(data))
+        self.args = args
+        self.k_values = []
+        self.runs = []
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        self.pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                        initargs=(data, self.weights))
+
+    def trial_tasks(self, run_number, k):
+        # 与 Simpoint::doClustering 相同：第 r 轮第 s 次试验的种子为 seedkm + r * numInitSeeds + 2 * s
+        base = self.args.seedkm + run_number * self.args.numInitSeeds
+        return [(k, self.args.initkm, base + 2 * s, self.args.iters)
+                for s in range(self.args.numInitSeeds)]
+
+    def best_trial(self, results):
+        best = 0
+        for i, (_, _, bic) in enumerate(results):
+            if bic > results[best][2]:
+                best = i
+        return results[best]
+
+    def add_run(self, k, result):
+        self.k_values.append(k)
+        self.runs.append(result)
+        print(f"  k = {k:3d}  BIC = {result[2]:.6g}")
+
+    def full_search(self, k_values):
+        """所有 k 的所有初始化种子一起提交到进程池。"""
+        tasks = []
+        for run_number, k in enumerate(k_values):
+            tasks.extend(self.trial_tasks(run_number, k))
+        results = list(self.pool.map(run_trial, tasks))
+        seeds = self.args.numInitSeeds
+        for run_number, k in enumerate(k_values):
+            self.add_run(k, self.best_trial(results[run_number * seeds:(run_number + 1) * seeds]))
+
+    def binary_search(self, max_k):
+        """与 bin/simpoint 的 "-k search" 相同的二分搜索，每个 k 的初始化种子并行执行。"""
+        search_min, search_max = 1, max_k
+        k_values = [search_min, search_max, (search_max + search_min) // 2]
+        min_ndx = max_ndx = 0
+        run_number = 0
+        while run_number < len(k_values):
+            results = list(self.pool.map(run_trial, self.trial_tasks(run_number, k_values[run_number])))
+            self.add_run(k_values[run_number], self.best_trial(results))
+            bics = [bic for _, _, bic in self.runs]
+            if bics[run_number] > bics[max_ndx]:
+                max_ndx = run_number
+            if bics[run_number] < bics[min_ndx]:
+                min_ndx = run_number
+            threshold = bics[min_ndx] + (bics[max_ndx] - bics[min_ndx]) * self.args.bicThreshold
+            last_k = k_values[run_number]
+            if run_number >= 2:
+                search_upper = bics[-1] < threshold if max_ndx > min_ndx else False
+                if search_upper:
+                    next_k = (last_k + search_max) // 2
+                    search_min = last_k
+                else:
+                    next_k = (last_k + search_min) // 2
+                    search_max = last_k
+                if search_max - search_min > 1:
+                    k_values.append(next_k)
+            run_number += 1
+
+    def best_run(self):
+        """BIC 不低于阈值的最小 k（Simpoint::findBestRun）。"""
+        if len(self.runs) == 1:
+            return 0
+        bics = [bic for _, _, bic in self.runs]
+        threshold = (max(bics) - min(bics)) * self.args.bicThreshold + min(bics)
+        best = -1
+        for i, bic in enumerate(bics):
+            if bic >= threshold and (best == -1 or self.k_values[i] < self.k_values[best]):
+                best = i
+        return best
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def nonempty_clusters(center_weights):
+    """Simpoint::getLargestClusters(1.0)：按权重从大到小累加到 1 为止的非空簇。"""
+    order = sorted(((w, i) for i, w in enumerate(center_weights)), reverse=True)
+    selected = [False] * len(center_weights)
+    covered = 0.0
+    for w, i in order:
+        if covered >= 1.0 or w <= 0.0:
+            break
+        covered += w
+        selected[i] = True
+    return selected
+
+
+def save_results(data, centers, center_weights, simpoints_file, weights_file):
+    labels, dist2 = nearest_centers(data, centers)
+    dists = np.sqrt(dist2)
+    selected = nonempty_clusters(center_weights)
+
+    simpoints = [-1] * len(centers)
+    min_dists = [0.0] * len(centers)
+    for i, (label, dist) in enumerate(zip(labels.tolist(), dists.tolist())):
+        if simpoints[label] == -1 or dist < min_dists[label]:
+            simpoints[label] = i
+            min_dists[label] = dist
+
+    if simpoints_file:
+        with open(simpoints_file, 'w') as f:
+            for i, chosen in enumerate(selected):
+                if chosen:
+                    f.write(f"{simpoints[i]} {i}\n")
+
+    if weights_file:
+        total = 0.0
+        for i, chosen in enumerate(selected):
+            if chosen:
+                total += center_weights[i]
+        with open(weights_file, 'w') as f:
+            for i, chosen in enumerate(selected):
+                if chosen:
+                    f.write(f"{center_weights[i] / total:.6g} {i}\n")
+
+
+def parse_k_values(text):
+    """解析 -k 参数：R(,R)*，R 为 k、start:end 或 start:step:end。"""
+    k_values = []
+    for part in text.split(','):
+        fields = [int(f) for f in part.split(':')]
+        if len(fields) == 1:
+            k_values.append(fields[0])
+            continue
+        start, end = fields[0], fields[-1]
+        step = fields[1] if len(fields) == 3 else (1 if end >= start else -1)
+        k_values.extend(range(start, end + (1 if step > 0 else -1), step))
+    return k_values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SimPoint 聚类（bin/simpoint 的 Python 实现）')
+    parser.add_argument('-loadFVFile', required=True, help='BBV 文件（文本、gzip 或 .npz）')
+    parser.add_argument('-maxK', type=int, default=None, help='搜索的最大聚类数')
+    parser.add_argument('-k', type=str, default=None, help='指定 k 列表，如 "10"、"1:30" 或 "5,10:2:20"（不搜索）')
+    parser.add_argument('-saveSimpoints', type=str, default=None, help='simpoints 输出文件')
+    parser.add_argument('-saveSimpointWeights', type=str, default=None, help='weights 输出文件')
+    parser.add_argument('-dim', type=int, default=DEFAULT_DIMENSIONS, help='随机投影后的维数（默认 15）')
+    parser.add_argument('-numInitSeeds', type=int, default=DEFAULT_NUM_INIT_SEEDS, help='每个 k 的初始化次数（默认 5）')
+    parser.add_argument('-iters', type=int, default=DEFAULT_KMEANS_ITERATIONS, help='k-means 最大迭代次数（默认 100）')
+    parser.add_argument('-bicThreshold', type=float, default=DEFAULT_BIC_THRESHOLD, help='BIC 阈值（默认 0.9）')
+    parser.add_argument('-initkm', choices=INIT_TYPES, default='kmeans++', help='初始化方式（默认 kmeans++）')
+    parser.add_argument('-seedkm', type=int, default=DEFAULT_RANDSEED_KMEANS_INIT, help='k-means 初始化种子')
+    parser.add_argument('-seedproj', type=int, default=DEFAULT_RANDSEED_PROJECTION, help='随机投影种子')
+    parser.add_argument('-search', choices=('full', 'binary'), default='full',
+                        help='full: 并行扫描 1..maxK；binary: 与 bin/simpoint 相同的二分搜索（默认 full）')
+    parser.add_argument('-jobs', type=int, default=0, help='并行进程数（<= 0 表示使用全部核心，默认 0）')
+    parser.add_argument('-inputVectorsGzipped', action='store_true', help='兼容 bin/simpoint 的参数，gzip 会自动识别')
+    args = parser.parse_args()
+
+    if (args.k is None) == (args.maxK is None):
+        parser.error('必须且只能指定 -maxK 或 -k 其中之一')
+
+    start = time.perf_counter()
+    data = load_vectors(args.loadFVFile, args.dim, args.seedproj)
+    print(f"读取并投影 {args.loadFVFile}：{data.shape[0]} 个 interval，{data.shape[1]} 维 "
+          f"({time.perf_counter() - start:.2f} s)")
+
+    clusterer = Clusterer(data, args)
+    try:
+        if args.k is not None:
+            clusterer.full_search(parse_k_values(args.k))
+        elif args.search == 'binary':
+            clusterer.binary_search(args.maxK)
+        else:
+            clusterer.full_search(list(range(1, args.maxK + 1)))
+    finally:
+        clusterer.close()
+
+    best = clusterer.best_run()
+    centers, center_weights, _ = clusterer.runs[best]
+    print(f"按 BIC 阈值 {args.bicThreshold} 选择 k = {clusterer.k_values[best]} "
+          f"(共 {len(clusterer.runs)} 个 k，{time.perf_counter() - start:.2f} s)")
+    save_results(data, centers, center_weights, args.saveSimpoints, args.saveSimpointWeights)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+interval 内存镜像的页增量编码，用于缩短板上切换 interval 时的内存加载时间。
+
+以 dumpoutput/ 中第一个（或 --base 指定的）interval 的镜像为基准 base.bin，
+其余每个 interval 只保存与基准内容不同的页（默认 4 KiB）：
+
+  delta 文件格式（little-endian）：
+    头部  magic 'PDLT' | u32 版本 | u32 页大小 | u64 镜像大小 | u32 页数 n
+    索引  n 个 u32 页号（递增）
+    数据  n 页内容，每页按页大小补齐，还原时按镜像大小截断
+
+manifest.json 记录基准与每个 interval 的 delta 文件、页数和镜像大小。
+主机端可随时还原任一 interval 的完整镜像，也可生成从 interval A 切换到 B 时
+只需写入的页（--from），板上只传输这些页。
+
+用法: python scripts/page_delta.py encode <dumpoutput_dir> <delta_dir> [--base N] [--page-size 4096] [--jobs N]
+      python scripts/page_delta.py decode <delta_dir> <interval> <output.bin> [--from N]
+      python scripts/page_delta.py verify <delta_dir> <dumpoutput_dir>
+"""
+import argparse
+import json
+import os
+import shutil
+import struct
+import sys
+
+import numpy as np
+
+from dumpstore import PAGE_SIZE, interval_number
+from patch_interval import interval_dumps
+
+# 共用 mem_builder 中的进程池批处理
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mem_builder'))
+from batch import run_batch
+
+MAGIC = b'PDLT'
+VERSION = 1
+HEADER = struct.Struct('<4sIIQI')
+MANIFEST = 'manifest.json'
+BASE_NAME = 'base.bin'
+
+
+def read_pages(path, page_size, n_pages=None):
+    """读入镜像并按页补零，返回 (n_pages x page_size 的 uint8 数组, 原始大小)。"""
+    data = np.fromfile(path, dtype=np.uint8)
+    size = data.size
+    if n_pages is None:
+        n_pages = -(-size // page_size)
+    pages = np.zeros(n_pages * page_size, dtype=np.uint8)
+    keep = min(size, pages.size)
+    pages[:keep] = data[:keep]
+    return pages.reshape(n_pages, page_size), size
+
+
+def diff_pages(base, target):
+    """target 中与 base 不同（或超出 base 范围）的页号。"""
+    common = min(len(base), len(target))
+    changed = np.flatnonzero(np.any(base[:common] != target[:common], axis=1))
+    return np.concatenate([changed, np.arange(common, len(target))]).astype('<u4')
+
+
+def write_delta(path, page_size, image_size, indices, pages):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, page_size, image_size, len(indices)))
+        f.write(indices.astype('<u4').tobytes())
+        f.write(pages[indices].tobytes())
+
+
+def read_delta(path):
+    """返回 (页大小, 镜像大小, 页号数组, 页数据数组)。"""
+    with open(path, 'rb') as f:
+        magic, version, page_size, image_size, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是版本 {VERSION} 的页增量文件")
+        indices = np.frombuffer(f.read(4 * count), dtype='<u4')
+        pages = np.frombuffer(f.read(count * page_size), dtype=np.uint8).reshape(count, page_size)
+    return page_size, image_size, indices, pages
+
+
+def encode_delta(base_file, dump_file, delta_file, page_size):
+    """生成单个 interval 相对基准的 delta，返回 (变化页数, 镜像大小)。"""
+    base, _ = read_pages(base_file, page_size)
+    target, image_size = read_pages(dump_file, page_size)
+    indices = diff_pages(base, target)
+    write_delta(delta_file, page_size, image_size, indices, target)
+    print(f"{os.path.basename(dump_file)}: {len(indices)} / {len(target)} 页 -> {delta_file}")
+    return len(indices), image_size
+
+
+def encode(dump_dir, delta_dir, base_interval=None, page_size=PAGE_SIZE, jobs=0):
+    """把 dump_dir 中的各 interval 镜像编码为基准 + 页增量，写出 manifest 并返回。"""
+    files = interval_dumps(dump_dir)
+    if not files:
+        raise ValueError(f"{dump_dir} 中没有 interval_*_dumpmem.bin")
+    numbers = [interval_number(path) for path in files]
+    # 在清空 delta_dir 之前检查，避免 --base 写错时丢掉已有的编码结果
+    if base_interval is not None and base_interval not in numbers:
+        raise ValueError(f"{dump_dir} 中没有 interval {base_interval}，可用的 interval：{', '.join(map(str, numbers))}")
+    base_file = files[0] if base_interval is None else files[numbers.index(base_interval)]
+
+    if os.path.exists(delta_dir):
+        shutil.rmtree(delta_dir)
+    os.makedirs(delta_dir)
+    shutil.copyfile(base_file, os.path.join(delta_dir, BASE_NAME))
+
+    tasks = []
+    for path in files:
+        name = os.path.splitext(os.path.basename(path))[0] + '.delta'
+        tasks.append((path, (base_file, path, os.path.join(delta_dir, name), page_size)))
+    failures, results = run_batch(encode_delta, tasks, jobs)
+    if failures:
+        raise RuntimeError(f"{len(failures)} 个 interval 编码失败")
+
+    intervals = []
+    for number, path, (_, (_, _, delta_file, _)), (count, image_size) in zip(numbers, files, tasks, results):
+        intervals.append({
+            'interval': number,
+            'file': os.path.basename(path),
+            'delta': os.path.basename(delta_file),
+            'pages': count,
+            'image_size': image_size,
+        })
+    manifest = {'page_size': page_size, 'base': BASE_NAME,
+                'base_interval': interval_number(base_file), 'intervals': intervals}
+    with open(os.path.join(delta_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    full = sum(entry['image_size'] for entry in intervals)
+    delta = os.path.getsize(os.path.join(delta_dir, BASE_NAME)) + sum(entry['pages'] for entry in intervals) * page_size
+    print(f"{len(intervals)} 个 interval：完整镜像共 {full / 2**20:.2f} MiB，基准 + 增量共 {delta / 2**20:.2f} MiB")
+    return manifest
+
+
+def load_manifest(delta_dir):
+    with open(os.path.join(delta_dir, MANIFEST)) as f:
+        return json.load(f)
+
+
+def find_entry(manifest, interval):
+    for entry in manifest['intervals']:
+        if entry['interval'] == interval:
+            return entry
+    available = ', '.join(str(entry['interval']) for entry in manifest['intervals'])
+    raise ValueError(f"manifest 中没有 interval {interval}，可用的 interval：{available}")
+
+
+def reconstruct(delta_dir, interval, manifest=None):
+    """还原 interval 的完整镜像（bytes）。"""
+    manifest = manifest or load_manifest(delta_dir)
+    entry = find_entry(manifest, interval)
+    page_size, image_size, indices, pages = read_delta(os.path.join(delta_dir, entry['delta']))
+    n_pages = -(-image_size // page_size)
+    image, _ = read_pages(os.path.join(delta_dir, manifest['base']), page_size, n_pages)
+    image[indices] = pages
+    return image.reshape(-1)[:image_size].tobytes()
+
+
+def transition(delta_dir, from_interval, to_interval, output_file):
+    """
+    生成把板上 from_interval 的镜像改成 to_interval 所需写入的页（同样为 delta 格式），返回页数。
+    只包含两者内容确实不同的页。
+    """
+    manifest = load_manifest(delta_dir)
+    page_size = manifest['page_size']
+    image_size = find_entry(manifest, to_interval)['image_size']
+    n_pages = -(-image_size // page_size)
+    src = np.zeros(n_pages * page_size, dtype=np.uint8)
+    old = np.frombuffer(reconstruct(delta_dir, from_interval, manifest), dtype=np.uint8)[:src.size]
+    src[:old.size] = old
+    src[image_size:] = 0  # 镜像大小之外的内容无需写入
+    dst = np.zeros(n_pages * page_size, dtype=np.uint8)
+    dst[:image_size] = np.frombuffer(reconstruct(delta_dir, to_interval, manifest), dtype=np.uint8)
+    src, dst = src.reshape(n_pages, page_size), dst.reshape(n_pages, page_size)
+    indices = np.flatnonzero(np.any(src != dst, axis=1)).astype('<u4')
+    write_delta(output_file, page_size, image_size, indices, dst)
+    return len(indices)
+
+
+def verify(delta_dir, dump_dir):
+    """逐个还原并与 dump_dir 中的原始镜像比较，返回不一致的 interval 列表。"""
+    manifest = load_manifest(delta_dir)
+    mismatched = []
+    for entry in manifest['intervals']:
+        with open(os.path.join(dump_dir, entry['file']), 'rb') as f:
+            if f.read() != reconstruct(delta_dir, entry['interval'], manifest):
+                mismatched.append(entry['interval'])
+    print(f"校验 {len(manifest['intervals'])} 个 interval，不一致 {len(mismatched)} 个")
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='interval 镜像的页增量编码与还原')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('encode', help='把 dumpoutput 编码为基准 + 页增量')
+    p.add_argument('dump_dir', help='interval_*_dumpmem.bin 所在目录')
+    p.add_argument('delta_dir', help='输出目录（会被清空）')
+    p.add_argument('--base', type=int, default=None, help='作为基准的 interval 编号（默认第一个）')
+    p.add_argument('--page-size', type=int, default=PAGE_SIZE, help='页大小（默认 4096）')
+    p.add_argument('--jobs', '-j', type=int, default=0, help='并行进程数（<= 0 表示使用全部核心，默认 0）')
+
+    p = sub.add_parser('decode', help='还原某个 interval 的完整镜像')
+    p.add_argument('delta_dir', help='encode 的输出目录')
+    p.add_argument('interval', type=int, help='interval 编号')
+    p.add_argument('output', help='输出文件')
+    p.add_argument('--from', dest='from_interval', type=int, default=None,
+                   help='只输出从该 interval 切换过来需要写入的页（delta 格式）')
+
+    p = sub.add_parser('verify', help='还原全部 interval 并与原始镜像比较')
+    p.add_argument('delta_dir', help='encode 的输出目录')
+    p.add_argument('dump_dir', help='原始 interval_*_dumpmem.bin 所在目录')
+
+    args = parser.parse_args()
+    if args.command == 'encode':
+        try:
+            encode(args.dump_dir, args.delta_dir, args.base, args.page_size, args.jobs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+    elif args.command == 'decode':
+        try:
+            if args.from_interval is None:
+                image = reconstruct(args.delta_dir, args.interval)
+                with open(args.output, 'wb') as f:
+                    f.write(image)
+            else:
+                count = transition(args.delta_dir, args.from_interval, args.interval, args.output)
+                print(f"interval {args.from_interval} -> {args.interval}：需写入 {count} 页")
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+    else:
+        return 1 if verify(args.delta_dir, args.dump_dir) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
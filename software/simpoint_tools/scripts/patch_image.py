@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+不重新编译、不重新链接，直接改写已链接的 <app>-riscv64-xs.bin 中所有 Init_data 表的 ra / sp，
+效果与 make choose_idx（fuzz_interval.py 改写 Interval_init.S 后重新编译）相同。
+
+  - 各 Init_data_i / Simpoint_data 的地址来自 ELF 符号表；
+  - 槽位相对表头的偏移与 interval 编号来自 interval.py 写出的旁路索引 Interval_init.index.json；
+  - bin 由 objcopy -O binary 生成，文件偏移 = 地址 - 最低的可分配段地址；
+  - 原始值取自索引（interval.py 按 NEMU 状态写出），不读 ELF：make choose_idx 之后 ELF 中的
+    ra / sp 已被改写；因此无论 ELF / bin 是否改过，都可以对同一个 bin 反复切换 interval。
+
+库接口：
+    patcher = ImagePatcher(elf, bin, index)
+    for idx in patcher.intervals():
+        patcher.retarget(idx)
+        patcher.save()
+
+用法: python scripts/patch_image.py <elf> <bin> <interval> --index Interval_init.index.json
+                                     [--slots ra sp] [--output FILE]
+"""
+import argparse
+import json
+import shutil
+import struct
+import sys
+
+from elftools.elf.constants import SH_FLAGS
+from elftools.elf.elffile import ELFFile
+from elftools.elf.sections import SymbolTableSection
+
+from fuzz_interval import DEFAULT_SLOTS
+from interval import INDEX_SLOTS
+
+
+def image_base(elffile):
+    """objcopy -O binary 输出的起始地址：最低的非空可分配段。"""
+    return min(section['sh_addr'] for section in elffile.iter_sections()
+               if section['sh_flags'] & SH_FLAGS.SHF_ALLOC and section['sh_size'] > 0)
+
+
+class ImagePatcher:
+    """
+    载入一次 ELF 与旁路索引，记下各表槽位在 bin 中的偏移及原始值，之后可反复切换 interval。
+    指定 output_file 时先把 bin 复制过去，只改写副本。
+    """
+
+    def __init__(self, elf_file, bin_file, index_file, output_file=None):
+        with open(index_file) as f:
+            tables = json.load(f)['tables']
+        if any('values' not in table for table in tables):
+            raise ValueError(f"{index_file} 中没有原始值，请重新运行 interval.py 生成索引")
+        if output_file is not None and output_file != bin_file:
+            shutil.copyfile(bin_file, output_file)
+            bin_file = output_file
+        self.bin_file = bin_file
+
+        with open(elf_file, 'rb') as f:
+            elffile = ELFFile(f)
+            symtab = elffile.get_section_by_name('.symtab')
+            if not isinstance(symtab, SymbolTableSection):
+                raise ValueError(f"{elf_file} 中没有符号表")
+            base = image_base(elffile)
+            self.slots = []  # 每个表 {寄存器: (bin 偏移, 原始值)}
+            for table in tables:
+                symbols = symtab.get_symbol_by_name(table['name'])
+                if not symbols:
+                    raise ValueError(f"{elf_file} 中没有符号 {table['name']}")
+                address = symbols[0]['st_value']
+                self.slots.append({key: (address + offset - base, table['values'][key])
+                                   for key, offset in table['offsets'].items()})
+
+        with open(bin_file, 'rb') as f:
+            f.seek(0, 2)
+            size = f.tell()
+        end = max((pos for slots in self.slots for pos, _ in slots.values()), default=0) + 8
+        if end > size:
+            raise ValueError(f"{bin_file} 大小 0x{size:x} 不足以容纳 Init_data（需要 0x{end:x}），bin 与 ELF 不匹配")
+
+        self.by_interval = {table['interval']: i for i, table in enumerate(tables) if table['interval'] is not None}
+        self.names = [table['name'] for table in tables]
+        self.pending = {}
+
+    def intervals(self):
+        return list(self.by_interval)
+
+    def retarget(self, interval_num, slots=DEFAULT_SLOTS):
+        """所有表的 slots 改为 interval_num 的原始值，其余槽位恢复原始值（save() 写回），返回这些值。"""
+        if interval_num not in self.by_interval:
+            raise ValueError(f"Interval {interval_num} 不在索引中")
+        target = self.slots[self.by_interval[interval_num]]
+        missing = [key for key in slots if key not in target]
+        if missing:
+            raise ValueError(f"{self.names[self.by_interval[interval_num]]} 中没有 {', '.join(missing)}")
+        self.pending = {}
+        for table in self.slots:
+            for key, (pos, value) in table.items():
+                self.pending[pos] = target[key][1] if key in slots else value
+        return {key: target[key][1] for key in slots}
+
+    def save(self):
+        """逐槽位原地写 8 字节。"""
+        with open(self.bin_file, 'r+b') as f:
+            for pos, value in self.pending.items():
+                f.seek(pos)
+                f.write(struct.pack('<Q', value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Patch ra/sp of every Init_data table in a linked .bin without rebuilding')
+    parser.add_argument('elf_file', help='<app>-riscv64-xs.elf the bin was made from')
+    parser.add_argument('bin_file', help='<app>-riscv64-xs.bin to patch (in place unless --output)')
+    parser.add_argument('interval', type=int, help='Interval number (as in "# Interval N")')
+    parser.add_argument('--index', required=True, help='Interval_init.index.json written by interval.py')
+    parser.add_argument('--slots', nargs='+', choices=INDEX_SLOTS, default=list(DEFAULT_SLOTS),
+                        help='Registers to retarget (default: ra sp)')
+    parser.add_argument('--output', default=None, help='Write the patched image here instead of in place')
+    args = parser.parse_args()
+
+    try:
+        patcher = ImagePatcher(args.elf_file, args.bin_file, args.index, args.output)
+        values = patcher.retarget(args.interval, args.slots)
+        patcher.save()
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(', '.join(f"{key} = {hex(value)}" for key, value in values.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
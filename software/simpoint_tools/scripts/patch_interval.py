@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+interval dump 的 bin -> bin 直接处理，替代 ninth_step 中 truncate.py -> bin2txt.py -> txt2bin.py 的三步。
+
+对每个 interval_N_dumpmem.bin（mmap 只读映射，原始 dump 不被修改）：
+  1. 去掉尾部的 0（从文件末尾按块向前扫描）；
+  2. 从 .data 段偏移处截取（与 truncate.py 相同，偏移为 .data 地址 - 0x100000000）；
+  3. 把 Init_counter 改写为该 interval 在排序后的序号（与 bin2txt.py 相同）；
+然后直接写出二进制，结果与原来三步得到的 dumpoutput 文件逐字节一致。
+文本文件只在指定 --txt 时作为调试输出写出。
+
+用法: python scripts/patch_interval.py <elf> <dumpfile_dir> <output_dir> [--txt dumptxt]
+                                       [--symbol Init_counter] [--jobs N]
+"""
+import argparse
+import glob
+import mmap
+import os
+import re
+import struct
+import sys
+
+import bin2txt
+import truncate
+
+# 共用 mem_builder 中的进程池批处理
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mem_builder'))
+from batch import run_batch
+
+MEMORY_BASE = 0x100000000
+
+
+def interval_dumps(folder, ext='.bin'):
+    """按编号排序的 interval_N_dumpmem 文件。"""
+    files = []
+    for path in glob.glob(os.path.join(folder, f"interval_*_dumpmem{ext}")):
+        m = re.search(r'(\d+)_dumpmem', os.path.basename(path))
+        if m:
+            files.append((int(m.group(1)), path))
+    return [path for _, path in sorted(files)]
+
+
+def counter_offset(elf_file, symbol='Init_counter'):
+    """从 ELF 中取 (.data 在原始 dump 中的偏移, symbol 相对 .data 的偏移)；后者即 dumpoutput 中 symbol 的位置。"""
+    data_section_start = truncate.get_data_section_start(elf_file)
+    symbol_address = bin2txt.get_symbol_address(elf_file, symbol)
+    if data_section_start is None or symbol_address is None:
+        raise ValueError(f"无法从 {elf_file} 获取 .data 起始地址或 {symbol}")
+    print(f"Data segment starts at: 0x{data_section_start:08x}, {symbol} at: 0x{symbol_address:08x}")
+    return data_section_start - MEMORY_BASE, symbol_address - data_section_start
+
+
+def patch_dump(input_file, output_file, data_offset, counter_offset, sequence_number, txt_file=None):
+    """
+    处理单个 dump：data_offset 为 .data 在 dump 中的偏移，counter_offset 为 Init_counter 相对 .data 的偏移。
+    output_file 可以与 input_file 相同（原地处理）。返回写出的字节数。
+    """
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"{input_file} 为空")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = truncate.trimmed_size(mm)
+            if data_offset < 0 or data_offset >= end:
+                raise ValueError(f"{input_file}：.data 偏移 0x{data_offset:x} 超出去掉尾部 0 后的大小 0x{end:x}")
+            data = bytearray(mm[data_offset:end])
+    if counter_offset < 0 or counter_offset + 8 > len(data):
+        raise ValueError(f"{input_file}：Init_counter 偏移 0x{counter_offset:x} 超出数据段大小 0x{len(data):x}")
+    data[counter_offset:counter_offset + 8] = struct.pack('<Q', sequence_number)
+    with open(output_file, 'wb') as f:
+        f.write(data)
+    if txt_file is not None:
+        bin2txt.write_txt_little_endian(data, txt_file)
+    print(f"Processed: {input_file} -> {output_file} ({len(data)} bytes, Init_counter = {sequence_number})")
+    return len(data)
+
+
+def patch_all(elf_file, input_dir, output_dir, txt_dir=None, symbol='Init_counter', jobs=0):
+    """从 ELF 中取一次 .data 起始地址与符号地址，并行处理 input_dir 中的所有 dump。返回失败列表。"""
+    data_offset, symbol_offset = counter_offset(elf_file, symbol)
+
+    for folder in (output_dir, txt_dir):
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+    tasks = []
+    for index, input_file in enumerate(interval_dumps(input_dir)):
+        base = os.path.splitext(os.path.basename(input_file))[0]
+        txt_file = os.path.join(txt_dir, base + '.txt') if txt_dir is not None else None
+        tasks.append((input_file, (input_file, os.path.join(output_dir, base + '.bin'),
+                                   data_offset, symbol_offset, index, txt_file)))
+    failures, _ = run_batch(patch_dump, tasks, jobs)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trim, cut at .data and patch Init_counter of interval dumps (bin -> bin)")
+    parser.add_argument('elf_file', type=str, help="ELF file to extract .data start and symbol address")
+    parser.add_argument('input_directory', type=str, help="Directory containing interval_*_dumpmem.bin")
+    parser.add_argument('output_directory', type=str, help="Directory to store the patched bin files")
+    parser.add_argument('--txt', type=str, default=None, help="Also write the text form to this directory (debug)")
+    parser.add_argument('--symbol', type=str, default="Init_counter", help="Symbol to patch (default: Init_counter)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Number of worker processes (<= 0: all cores, default 0)")
+    args = parser.parse_args()
+
+    failures = patch_all(args.elf_file, args.input_directory, args.output_directory, args.txt, args.symbol, args.jobs)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
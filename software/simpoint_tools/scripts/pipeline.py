@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+SimPoint 流程（Makefile 中 first_step ... eleventh_step）的并行、带缓存的驱动。
+
+每一步被建模为依赖图中的一个节点，声明输入、参数和输出：
+  - 输入内容（文件或源码目录）与参数的 BLAKE2b 哈希作为该步的键，
+    键未变且输出仍与上次记录一致时直接跳过（缓存命中）；
+  - 依赖都已完成的步骤并行执行，例如反汇编与 NEMU 采样、instmap 与聚类；
+    修改共享源码树（Interval_init.S）并编译的步骤通过资源锁串行；
+  - 第 9 步按 interval 在进程池中并行处理 dump（patch_interval 直接 bin -> bin，--dump-txt 时才输出文本）；
+  - 每一步的耗时与是否命中缓存在结束时汇总打印，并写入 output/pipeline/timing.json。
+
+与 Makefile 不同，每次编译后的 elf/bin/txt 以及 NEMU 的输出都会复制到
+output/pipeline/<step>/ 中，下游步骤只读取这些快照，不再依赖会被后续编译覆盖的共享路径，
+原始 dump 也不再被原地截断。因此只修改 maxK 时，聚类之前的编译、采样、instmap 全部命中缓存。
+
+批量模式（--apps）同时对多个 benchmark 切片。每个 app 使用独立的工作目录 <root>/<app>/，
+其中有自己的 output/ dumpfile/ dumptxt/ dumpoutput/ on_board/、一份私有的 workload_gen 源码树
+（Interval_init.S 只在这份副本中修改）以及 NEMU 的运行目录，app 之间不共享任何可写路径。
+app 并发数与每个 app 内的并行度按 CPU 核数分配。
+
+用法: python scripts/pipeline.py [--app microbench] [--maxK 60] [--interval-length 3000]
+                                 [--kmeans cpp|python] [--jobs N] [--until STEP] [--force STEP ...]
+      python scripts/pipeline.py --apps coremark dhrystone microbench [--root DIR] [--jobs N] ...
+"""
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import bin2txt
+import patch_interval
+import truncate
+from patch_interval import interval_dumps
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SIMPOINT_DIR = os.path.dirname(SCRIPTS_DIR)
+SOFTWARE_DIR = os.path.dirname(SIMPOINT_DIR)
+HASH_BLOCK = 1 << 20
+# 修改步骤定义时递增，使旧的缓存记录失效
+PIPELINE_VERSION = 6
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def tree_files(root, exclude=()):
+    """递归列出 root 下的文件（跳过 build 目录与 exclude 中的路径），按路径排序。"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in ('build', '__pycache__', '.git'))
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.abspath(path) not in exclude:
+                files.append(path)
+    return sorted(files)
+
+
+def input_digest(paths, exclude=()):
+    """输入可以是文件或目录，返回 {路径: 哈希}；不存在的路径记为 None。"""
+    exclude = {os.path.abspath(p) for p in exclude}
+    digests = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for f in tree_files(path, exclude):
+                digests[f] = file_digest(f)
+        elif os.path.exists(path):
+            digests[path] = file_digest(path)
+        else:
+            digests[path] = None
+    return digests
+
+
+def sync_tree(src, dst, keep=()):
+    """
+    把 src 同步到 dst（跳过 build 等目录）：只复制大小或 mtime 不同的文件，删除 src 中已不存在的文件，
+    dst 中的 build 目录原样保留，make 可以增量编译。keep 中的路径由流程自己维护，已存在时不覆盖。
+    """
+    keep = {os.path.abspath(p) for p in keep}
+    wanted = set()
+    for path in tree_files(src):
+        target = os.path.abspath(os.path.join(dst, os.path.relpath(path, src)))
+        wanted.add(target)
+        if target in keep and os.path.exists(target):
+            continue
+        st = os.stat(path)
+        try:
+            dt = os.stat(target)
+            if dt.st_size == st.st_size and int(dt.st_mtime) == int(st.st_mtime):
+                continue
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(path, target)
+    for path in tree_files(dst):
+        path = os.path.abspath(path)
+        if path not in wanted and path not in keep:
+            os.remove(path)
+
+
+class Config:
+    """流程中用到的路径与参数，默认值与 simpoint_tools/Makefile 相同。"""
+
+    def __init__(self, args):
+        self.app = args.app
+        self.option = args.option
+        self.interval_length = args.interval_length
+        self.maxK = args.maxK
+        self.kmeans = args.kmeans
+        self.dump_txt = getattr(args, 'dump_txt', False)
+        self.delta = getattr(args, 'delta', False)
+        self.jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        self.isolated = getattr(args, 'isolated', False)
+
+        self.workdir = os.path.abspath(args.workdir)
+        self.outdir = os.path.join(self.workdir, 'output')
+        self.state_dir = os.path.join(self.outdir, 'pipeline')
+        self.dumpfile_dir = os.path.join(self.workdir, 'dumpfile')
+        self.dumptxt_dir = os.path.join(self.workdir, 'dumptxt')
+        self.dumpoutput_dir = os.path.join(self.workdir, 'dumpoutput')
+        self.on_board_dir = os.path.join(self.workdir, 'on_board')
+
+        # 隔离模式下在工作目录中使用私有的 workload_gen 副本，共享树只读
+        self.source_home = os.path.join(SOFTWARE_DIR, 'workload_gen')
+        self.am_home = os.path.join(self.workdir, 'workload_gen') if self.isolated else self.source_home
+        self.benchmark_path = os.path.join(self.am_home, 'apps', self.app)
+        self.boot_dir = os.path.join(self.am_home, 'am', 'src', 'nemu', 'isa', 'riscv', 'boot')
+        self.interval_init_path = os.path.join(self.boot_dir, 'Interval_init.S')
+        self.interval_index_path = os.path.join(self.boot_dir, 'Interval_init.index.json')
+        self.binary_name = f"{self.app}-riscv64-xs"
+
+        self.toolchain = os.path.join(SOFTWARE_DIR, 'riscv-toolchain', 'bin')
+        self.gcc = os.path.join(self.toolchain, 'riscv64-unknown-linux-gnu-gcc')
+        self.objdump = os.path.join(self.toolchain, 'riscv64-unknown-linux-gnu-objdump')
+
+        self.nemu_dir = os.path.join(SOFTWARE_DIR, 'NEMU')
+        self.nemu = os.path.join(self.nemu_dir, 'build', 'riscv64-nemu-interpreter')
+        # NEMU 把 bbvoutput.txt 与 interval_init.txt 写在当前目录，隔离模式下每个 app 在自己的目录中运行
+        self.nemu_run_dir = os.path.join(self.workdir, 'nemu') if self.isolated else self.nemu_dir
+        self.profiling_dir = os.path.join(self.nemu_run_dir, 'test_for_profiling')
+        self.bbfile = os.path.join(self.profiling_dir, 'Profiling', 'workload', 'simpoint_bbv.gz')
+        self.bbvoutput = os.path.join(self.nemu_run_dir, 'bbvoutput.txt')
+        self.intervalfile = os.path.join(self.nemu_run_dir, 'interval_init.txt')
+
+        self.env = dict(os.environ)
+        self.env['AM_HOME'] = self.am_home
+        self.env['PATH'] = self.toolchain + os.pathsep + self.env.get('PATH', '')
+
+    def out(self, *parts):
+        return os.path.join(self.outdir, *parts)
+
+    def snapshot(self, step, ext):
+        return os.path.join(self.state_dir, step, f"{self.binary_name}.{ext}")
+
+    def source_trees(self):
+        return [os.path.join(self.am_home, 'am'), os.path.join(self.am_home, 'libs'),
+                self.benchmark_path] + sorted(glob.glob(os.path.join(self.am_home, 'Makefile*')))
+
+    def sync_sources(self):
+        """隔离模式下把共享的 workload_gen 同步到私有副本（只含本 app）；Interval_init.S 由流程维护。"""
+        if not self.isolated:
+            return
+        keep = [self.interval_init_path, self.interval_index_path]
+        for part in ('am', 'libs', 'share', 'tools', os.path.join('apps', self.app)):
+            src = os.path.join(self.source_home, part)
+            if os.path.isdir(src):
+                sync_tree(src, os.path.join(self.am_home, part), keep)
+        for path in glob.glob(os.path.join(self.source_home, 'Makefile*')):
+            target = os.path.join(self.am_home, os.path.basename(path))
+            if not os.path.exists(target) or file_digest(target) != file_digest(path):
+                shutil.copy2(path, target)
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Step:
+    """
+    依赖图中的一个节点。
+
+    inputs / outputs 为返回路径列表的函数（输出可以依赖运行结果，如按 glob 得到的 dump 文件）；
+    prepare 在计算键之前、持有资源锁时执行，用于把共享源码树切换到本步所需的状态；
+    resource 相同的步骤不会同时执行。
+    """
+
+    def __init__(self, name, deps, inputs, outputs, action, params=(), resource=None,
+                 prepare=None, exclude=()):
+        self.name = name
+        self.deps = list(deps)
+        self.inputs = inputs
+        self.outputs = outputs
+        self.action = action
+        self.params = [str(p) for p in params]
+        self.resource = resource
+        self.prepare = prepare
+        self.exclude = exclude
+
+
+def sh(cmd, cwd, log, env):
+    log.write(f"$ {cmd}\n")
+    log.flush()
+    result = subprocess.run(cmd, shell=True, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise StepFailed(f"命令失败（返回值 {result.returncode}）：{cmd}")
+
+
+def python(script, args, cwd, log, env):
+    sh(' '.join([sys.executable, os.path.join(SCRIPTS_DIR, script)] + [str(a) for a in args]), cwd, log, env)
+
+
+def copy_into(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
+def remove_if_exists(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def replace_if_changed(path, content):
+    """只在内容变化时写入，避免无谓地更新 mtime 导致 make 重新编译。"""
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def process_dump(raw_file, bin_file, txt_file, data_offset, counter_offset, sequence_number):
+    """
+    第 9 步中单个 interval 的处理：由 patch_interval 直接 bin -> bin 截断尾部 0、
+    从 .data 偏移处截取并改写 Init_counter，原始 dump 不被修改。返回捕获的输出。
+    """
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        patch_interval.patch_dump(raw_file, bin_file, data_offset, counter_offset, sequence_number, txt_file)
+    return buf.getvalue()
+
+
+def build_steps(cfg):
+    """按 Makefile 的十一步构造依赖图。"""
+    env = cfg.env
+    boot_interval = [cfg.interval_init_path, cfg.interval_index_path]
+
+    def build(step, mode, install_interval=False):
+        def prepare():
+            cfg.sync_sources()
+            if install_interval:
+                with open(cfg.out('Interval_init.S')) as f:
+                    replace_if_changed(cfg.interval_init_path, f.read())
+                # fuzz_interval.py 按旁路索引改写 Interval_init.S，二者一起放入 boot 目录
+                with open(cfg.out('Interval_init.index.json')) as f:
+                    replace_if_changed(cfg.interval_index_path, f.read())
+
+        # before / after 两种 start.o 都随 am 缓存，SIMPOINT 只决定链接哪一个
+        def action(log):
+            sh(f"make ARCH=riscv64-xs SIMPOINT={mode} {cfg.option}", cfg.benchmark_path, log, env)
+            for ext in ('bin', 'elf', 'txt'):
+                copy_into(os.path.join(cfg.benchmark_path, 'build', f"{cfg.binary_name}.{ext}"),
+                          cfg.snapshot(step, ext))
+
+        return action, prepare
+
+    def disasm(step, output):
+        def action(log):
+            sh(f"{cfg.objdump} -d -s {cfg.snapshot(step, 'elf')} > {output}", cfg.workdir, log, env)
+        return action
+
+    def run_nemu(program, log, extra=''):
+        os.makedirs(cfg.nemu_run_dir, exist_ok=True)
+        remove_if_exists(cfg.bbfile)
+        sh(f"{cfg.nemu} {program} -b --cpt-interval={cfg.interval_length} -D {cfg.profiling_dir} "
+           f"-C Profiling -w workload{extra}", cfg.nemu_run_dir, log, env)
+
+    # 1. 编译 benchmark（before 模式）。此模式下 start.S 不会进入 Init_table，且 .init / .interval
+    #    段链接在 .text / .data 之后，上一轮生成的 Interval_init.S 不影响采样结果，因此不计入缓存键
+    build_before, prepare_before = build('build_before', 'before')
+
+    # 2. NEMU 采样生成 simpoint_bbv.gz 与 bbvoutput.txt
+    def profile(log):
+        run_nemu(cfg.snapshot('build_before', 'bin'), log)
+        copy_into(cfg.bbfile, cfg.out('pipeline', 'profile', 'simpoint_bbv.gz'))
+        copy_into(cfg.bbvoutput, cfg.out('pipeline', 'profile', 'bbvoutput.txt'))
+
+    bbv = cfg.out('pipeline', 'profile', 'simpoint_bbv.gz')
+    simpoints = cfg.out('simpoints')
+
+    # 4. 聚类
+    def cluster(log):
+        if cfg.kmeans == 'python':
+            python('kmeans.py', ['-loadFVFile', bbv, '-maxK', cfg.maxK, '-jobs', cfg.jobs,
+                                 '-saveSimpoints', simpoints, '-saveSimpointWeights', cfg.out('weights')],
+                   SIMPOINT_DIR, log, env)
+        else:
+            sh(f"./bin/simpoint -loadFVFile {bbv} -inputVectorsGzipped -maxK {cfg.maxK} "
+               f"-saveSimpoints {simpoints} -saveSimpointWeights {cfg.out('weights')}", SIMPOINT_DIR, log, env)
+
+    # 6. 根据聚类结果获取各 interval 的起始状态；此次 dump 的内存不会被使用
+    def checkpoint(log):
+        scratch = cfg.out('pipeline', 'checkpoint', 'dumpfile')
+        os.makedirs(scratch, exist_ok=True)
+        remove_if_exists(cfg.intervalfile)
+        run_nemu(cfg.snapshot('build_before', 'bin'), log,
+                 f" -B {simpoints} --dump-mem={os.path.join(scratch, 'dumpmem.bin')}")
+        copy_into(cfg.intervalfile, cfg.out('pipeline', 'checkpoint', 'interval_init.txt'))
+        remove_if_exists(scratch)
+
+    # 7. 生成 Interval_init.S（interval.py 写入工作目录下的 output/）
+    def interval_init(log):
+        python('interval.py', [cfg.out('pipeline', 'checkpoint', 'interval_init.txt')], cfg.workdir, log, env)
+        sh(f"{cfg.gcc} -c output/Interval_init.S -o output/Interval_init.o", cfg.workdir, log, env)
+        sh(f"{cfg.objdump} -d -s output/Interval_init.o > {cfg.out('disasm2.txt')}", cfg.workdir, log, env)
+
+    # 8. 带 Interval_init.S 重新编译后运行，dump 各 interval 的内存
+    build_interval, prepare_interval = build('build_interval', 'before', install_interval=True)
+
+    def dump(log):
+        remove_if_exists(cfg.dumpfile_dir)
+        os.makedirs(cfg.dumpfile_dir)
+        run_nemu(cfg.snapshot('build_interval', 'bin'), log,
+                 f" -B {simpoints} --dump-mem={os.path.join(cfg.dumpfile_dir, 'dumpmem.bin')}")
+        copy_into(cfg.bbfile, cfg.out('simpoint.bb.gz'))
+
+    # 9. 按 interval 并行处理 dump
+    def dumps(log):
+        elf = cfg.snapshot('build_interval', 'elf')
+        data_section_start = truncate.get_data_section_start(elf)
+        symbol_address = bin2txt.get_symbol_address(elf, 'Init_counter')
+        if data_section_start is None or symbol_address is None:
+            raise StepFailed(f"无法从 {elf} 获取 .data 起始地址或 Init_counter")
+        for folder in (cfg.dumptxt_dir, cfg.dumpoutput_dir):
+            remove_if_exists(folder)
+        os.makedirs(cfg.dumpoutput_dir)
+        if cfg.dump_txt:
+            os.makedirs(cfg.dumptxt_dir)
+        raw = interval_dumps(cfg.dumpfile_dir)
+        with ProcessPoolExecutor(max_workers=cfg.jobs) as pool:
+            futures = []
+            for index, raw_file in enumerate(raw):
+                base = os.path.splitext(os.path.basename(raw_file))[0]
+                txt_file = os.path.join(cfg.dumptxt_dir, base + '.txt') if cfg.dump_txt else None
+                futures.append(pool.submit(process_dump, raw_file, os.path.join(cfg.dumpoutput_dir, base + '.bin'),
+                                           txt_file, data_section_start - patch_interval.MEMORY_BASE,
+                                           symbol_address - data_section_start, index))
+            for future in futures:
+                log.write(future.result())
+        log.write(f"处理 {len(raw)} 个 interval dump\n")
+
+    # 10. after 模式重新编译，给 DUT 运行采样程序
+    build_after, prepare_after = build('build_after', 'after')
+
+    # 11. 输出有效文件；--delta 时以基准镜像 + 页增量代替完整的 dumpoutput
+    def on_board(log):
+        remove_if_exists(cfg.on_board_dir)
+        if cfg.delta:
+            python('page_delta.py', ['encode', cfg.dumpoutput_dir, os.path.join(cfg.on_board_dir, 'delta'),
+                                     '--jobs', cfg.jobs], SIMPOINT_DIR, log, env)
+        else:
+            shutil.copytree(cfg.dumpoutput_dir, os.path.join(cfg.on_board_dir, 'dumpoutput'))
+        copy_into(cfg.snapshot('build_after', 'bin'), os.path.join(cfg.on_board_dir, f"{cfg.binary_name}.bin"))
+
+    snapshots = lambda step: lambda: [cfg.snapshot(step, ext) for ext in ('bin', 'elf', 'txt')]
+    return [
+        Step('build_before', [], cfg.source_trees, snapshots('build_before'), build_before,
+             params=[cfg.option, 'before'], resource='build', prepare=prepare_before, exclude=boot_interval),
+        Step('disasm_before', ['build_before'], lambda: [cfg.snapshot('build_before', 'elf')],
+             lambda: [cfg.out('disasm1.txt')], disasm('build_before', cfg.out('disasm1.txt'))),
+        Step('profile', ['build_before'], lambda: [cfg.snapshot('build_before', 'bin'), cfg.nemu],
+             lambda: [bbv, cfg.out('pipeline', 'profile', 'bbvoutput.txt')], profile,
+             params=[cfg.interval_length], resource='nemu'),
+        Step('instmap', ['profile', 'build_before'],
+             lambda: [cfg.out('pipeline', 'profile', 'bbvoutput.txt'), cfg.snapshot('build_before', 'txt')],
+             lambda: [cfg.out('instmap')],
+             lambda log: python('instout.py', [cfg.out('pipeline', 'profile', 'bbvoutput.txt'),
+                                               cfg.snapshot('build_before', 'txt'), cfg.out('instmap')],
+                                SIMPOINT_DIR, log, env)),
+        Step('cluster', ['profile'], lambda: [bbv], lambda: [simpoints, cfg.out('weights')], cluster,
+             params=[cfg.maxK, cfg.kmeans]),
+        Step('analyse', ['cluster', 'instmap'], lambda: [simpoints, bbv, cfg.out('instmap')],
+             lambda: [cfg.out('result.txt'), cfg.out('bbv.npz')],
+             lambda log: python('analyse.py', [simpoints, bbv, cfg.out('instmap'), cfg.out('result.txt'),
+                                               '--npz', cfg.out('bbv.npz')], SIMPOINT_DIR, log, env)),
+        Step('checkpoint', ['cluster', 'build_before'],
+             lambda: [cfg.snapshot('build_before', 'bin'), simpoints, cfg.nemu],
+             lambda: [cfg.out('pipeline', 'checkpoint', 'interval_init.txt')], checkpoint,
+             params=[cfg.interval_length], resource='nemu'),
+        Step('interval_init', ['checkpoint'], lambda: [cfg.out('pipeline', 'checkpoint', 'interval_init.txt')],
+             lambda: [cfg.out('Interval_init.S'), cfg.out('Interval_init.index.json'), cfg.out('Interval_init.o'),
+                      cfg.out('disasm2.txt')],
+             interval_init),
+        Step('build_interval', ['interval_init'], cfg.source_trees, snapshots('build_interval'), build_interval,
+             params=[cfg.option, 'before'], resource='build', prepare=prepare_interval),
+        Step('disasm_interval', ['build_interval'], lambda: [cfg.snapshot('build_interval', 'elf')],
+             lambda: [cfg.out('disasm3.txt')], disasm('build_interval', cfg.out('disasm3.txt'))),
+        Step('dump', ['build_interval', 'cluster'],
+             lambda: [cfg.snapshot('build_interval', 'bin'), simpoints, cfg.nemu],
+             lambda: interval_dumps(cfg.dumpfile_dir) + [cfg.out('simpoint.bb.gz')], dump,
+             params=[cfg.interval_length], resource='nemu'),
+        Step('dumps', ['dump', 'build_interval'],
+             lambda: interval_dumps(cfg.dumpfile_dir) + [cfg.snapshot('build_interval', 'elf')],
+             lambda: interval_dumps(cfg.dumptxt_dir, '.txt') + interval_dumps(cfg.dumpoutput_dir), dumps,
+             params=[cfg.dump_txt]),
+        Step('build_after', ['build_interval'], cfg.source_trees, snapshots('build_after'), build_after,
+             params=[cfg.option, 'after'], resource='build', prepare=prepare_after),
+        Step('disasm_after', ['build_after'], lambda: [cfg.snapshot('build_after', 'elf')],
+             lambda: [cfg.out('disasm4.txt')], disasm('build_after', cfg.out('disasm4.txt'))),
+        Step('on_board', ['dumps', 'build_after'],
+             lambda: interval_dumps(cfg.dumpoutput_dir) + [cfg.snapshot('build_after', 'bin')],
+             lambda: tree_files(cfg.on_board_dir), on_board, params=[cfg.delta]),
+    ]
+
+
+class Pipeline:
+    def __init__(self, cfg, steps, label=''):
+        self.cfg = cfg
+        self.prefix = f"[{label}] " if label else ''
+        self.steps = {step.name: step for step in steps}
+        self.order = [step.name for step in steps]
+        self.locks = {step.resource: threading.Lock() for step in steps if step.resource}
+        self.timing = {}
+        os.makedirs(os.path.join(cfg.state_dir, 'logs'), exist_ok=True)
+
+    def stamp_path(self, name):
+        return os.path.join(self.cfg.state_dir, f"{name}.json")
+
+    def step_key(self, step):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{PIPELINE_VERSION}/{step.name}/{'|'.join(step.params)}".encode())
+        for path, digest in sorted(input_digest(step.inputs(), step.exclude).items()):
+            h.update(f"{os.path.relpath(path, SOFTWARE_DIR)}={digest}\n".encode())
+        return h.hexdigest()
+
+    def up_to_date(self, step, key):
+        try:
+            with open(self.stamp_path(step.name)) as f:
+                stamp = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        if stamp.get('key') != key:
+            return False
+        outputs = stamp.get('outputs', {})
+        if sorted(outputs) != sorted(step.outputs()):
+            return False
+        return all(os.path.exists(p) and file_digest(p) == d for p, d in outputs.items())
+
+    def write_stamp(self, step, key):
+        outputs = {p: file_digest(p) for p in step.outputs()}
+        tmp = self.stamp_path(step.name) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'key': key, 'outputs': outputs}, f, indent=2)
+        os.replace(tmp, self.stamp_path(step.name))
+
+    def execute(self, name, force):
+        step = self.steps[name]
+        lock = self.locks.get(step.resource)
+        start = time.perf_counter()
+        if lock:
+            lock.acquire()
+        try:
+            if step.prepare:
+                step.prepare()
+            key = self.step_key(step)
+            if not force and self.up_to_date(step, key):
+                return 'cached', time.perf_counter() - start
+            log_path = os.path.join(self.cfg.state_dir, 'logs', f"{name}.log")
+            with open(log_path, 'w') as log:
+                try:
+                    step.action(log)
+                except StepFailed as e:
+                    raise StepFailed(f"{e}（日志：{log_path}）")
+            for path in step.outputs():
+                if not os.path.exists(path):
+                    raise StepFailed(f"{name} 未生成输出 {path}（日志：{log_path}）")
+            self.write_stamp(step, key)
+            return 'ran', time.perf_counter() - start
+        finally:
+            if lock:
+                lock.release()
+
+    def closure(self, targets):
+        """targets 及其所有依赖。"""
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.steps[name].deps)
+        return [name for name in self.order if name in needed]
+
+    def run(self, targets=None, force=()):
+        selected = self.closure(targets or self.order)
+        pending = list(selected)
+        done = set()
+        running = {}
+        failed = None
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.cfg.jobs) as pool:
+            while pending or running:
+                if failed is None:
+                    for name in [n for n in pending if all(d in done for d in self.steps[n].deps)]:
+                        pending.remove(name)
+                        print(f"{self.prefix}[开始] {name}")
+                        running[pool.submit(self.execute, name, name in force)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status, seconds = future.result()
+                    except Exception as e:
+                        failed = failed or name
+                        self.timing[name] = {'status': 'failed', 'seconds': None}
+                        print(f"{self.prefix}[失败] {name}: {e}")
+                        continue
+                    done.add(name)
+                    self.timing[name] = {'status': status, 'seconds': seconds}
+                    print(f"{self.prefix}[{'缓存' if status == 'cached' else '完成'}] {name} ({seconds:.2f} s)")
+        for name in pending:
+            self.timing[name] = {'status': 'skipped', 'seconds': None}
+        self.report(selected, time.perf_counter() - start)
+        return failed is None
+
+    def report(self, selected, total):
+        # 一次性打印整张表，批量模式下多个 app 的报告不会交错
+        lines = [f"\n=== {self.prefix}各步骤耗时 ==="]
+        for name in selected:
+            info = self.timing.get(name, {'status': 'skipped', 'seconds': None})
+            seconds = f"{info['seconds']:8.2f} s" if info['seconds'] is not None else '        -'
+            lines.append(f"  {name:<16} {info['status']:<8} {seconds}")
+        lines.append(f"  {'total':<16} {'':<8} {total:8.2f} s")
+        print('\n'.join(lines))
+        with open(os.path.join(self.cfg.state_dir, 'timing.json'), 'w') as f:
+            json.dump({'total': total, 'steps': self.timing}, f, indent=2)
+
+
+def run_batch(args):
+    """
+    并发切片多个 app。app 并发数为 min(app 数, 核数)，每个 app 内的并行度平分剩余核数；
+    每个 app 有独立的工作目录与 Pipeline（资源锁互不影响），某个 app 失败不影响其他 app。
+    """
+    cores = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    workers = min(len(args.apps), cores)
+
+    def run_app(app):
+        app_args = argparse.Namespace(**vars(args))
+        app_args.app = app
+        app_args.workdir = os.path.join(args.root, app)
+        app_args.jobs = max(1, cores // workers)
+        app_args.isolated = True
+        cfg = Config(app_args)
+        try:
+            return Pipeline(cfg, build_steps(cfg), label=app).run(args.until, set(args.force))
+        except Exception as e:
+            print(f"[{app}] [失败] {e}")
+            return False
+
+    print(f"批量切片 {len(args.apps)} 个 app：同时运行 {workers} 个，每个 app 并行度 {max(1, cores // workers)}")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(args.apps, pool.map(run_app, args.apps)))
+    failures = [app for app, ok in results.items() if not ok]
+    print(f"\n=== 批量切片完成：共 {len(results)} 个 app，成功 {len(results) - len(failures)} 个，"
+          f"失败 {len(failures)} 个 ===")
+    for app in failures:
+        print(f"  {app}: 日志见 {os.path.join(args.root, app, 'output', 'pipeline', 'logs')}")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行、带缓存地执行 SimPoint 切片流程')
+    parser.add_argument('--app', default='microbench', help='workload_gen/apps 下的 benchmark（默认 microbench）')
+    parser.add_argument('--option', default='', help='传给 benchmark make 的额外参数，如 mainargs=test')
+    parser.add_argument('--interval-length', type=int, default=3000, help='interval 长度（默认 3000）')
+    parser.add_argument('--maxK', type=int, default=60, help='最大聚类数（默认 60）')
+    parser.add_argument('--kmeans', choices=('cpp', 'python'), default='cpp', help='聚类后端（默认 cpp）')
+    parser.add_argument('--delta', action='store_true', help='on_board/ 中以基准镜像 + 页增量代替完整 dump（见 page_delta.py）')
+    parser.add_argument('--dump-txt', action='store_true', help='第 9 步同时输出 dumptxt/ 中的文本形式（调试用）')
+    parser.add_argument('--apps', nargs='+', default=None, help='批量模式：并发切片这些 app（各自隔离）')
+    parser.add_argument('--root', default=os.path.join(SIMPOINT_DIR, 'slices'),
+                        help='批量模式下各 app 工作目录的父目录（默认 simpoint_tools/slices）')
+    parser.add_argument('--workdir', default=SIMPOINT_DIR, help='output/ dumpfile/ 等目录所在位置')
+    parser.add_argument('--isolate', dest='isolated', action='store_true',
+                        help='单个 app 也使用私有的 workload_gen 副本与 NEMU 运行目录')
+    parser.add_argument('--jobs', '-j', type=int, default=0, help='并行度（<= 0 表示使用全部核心，默认 0）')
+    parser.add_argument('--until', nargs='+', default=None, help='只执行这些步骤及其依赖')
+    parser.add_argument('--force', nargs='+', default=(), help='忽略这些步骤的缓存')
+    args = parser.parse_args()
+
+    cfg = Config(args)
+    steps = build_steps(cfg)
+    names = [step.name for step in steps]
+    for name in (args.until or []) + list(args.force):
+        if name not in names:
+            parser.error(f"未知步骤 {name}，可选：{', '.join(names)}")
+    if args.apps:
+        args.root = os.path.abspath(args.root)
+        return 0 if run_batch(args) else 1
+    return 0 if Pipeline(cfg, steps).run(args.until, set(args.force)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
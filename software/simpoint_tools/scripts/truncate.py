@@ -1,7 +1,17 @@
-import sys
+import argparse
 import glob
+import mmap
+import os
+import sys
 from elftools.elf.elffile import ELFFile
 
+# 共用 mem_builder 中的进程池批处理
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mem_builder'))
+from batch import run_batch
+
+# 向前扫描尾部 0 与搬移数据时每次处理的块大小
+BLOCK_SIZE = 1 << 20
+
 def get_data_section_start(filename):
     """Get the starting address of the .data section in an ELF file."""
     with open(filename, 'rb') as f:
@@ -11,18 +21,26 @@ def get_data_section_start(filename):
                 return section['sh_addr']
     return None
 
+def trimmed_size(buf):
+    """去掉尾部 0 之后的长度；从末尾按块向前扫描，每块由 rstrip 在 C 中完成查找。"""
+    end = len(buf)
+    while end > 0:
+        start = max(0, end - BLOCK_SIZE)
+        kept = len(buf[start:end].rstrip(b'\x00'))
+        if kept:
+            return start + kept
+        end = start
+    return 0
+
 def truncate_file_at_zero_end(filename):
     """Truncate a file by removing trailing zero bytes."""
     with open(filename, 'r+b') as f:
-        f.seek(0, 2)
-        file_size = f.tell()
-        position = file_size - 1
-        while position >= 0:
-            f.seek(position)
-            if f.read(1) != b'\x00':
-                break
-            position -= 1
-        f.truncate(position + 1)
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        # 只映射不拷贝，全 0 的尾部按块跳过
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = trimmed_size(mm)
+        f.truncate(size)
 
 def keep_content_after_position(filename, position):
     """Keep the content of the file after a specified position."""
@@ -31,28 +49,39 @@ def keep_content_after_position(filename, position):
         file_size = f.tell()
         if position < 0 or position >= file_size:
             raise ValueError("Position must be within the range of the file size.")
-        f.seek(position)
-        remaining_content = f.read()
-        f.seek(0)
-        f.write(remaining_content)
-        f.truncate()
+        # 按块向前搬移，内存占用与文件大小无关
+        src, dst = position, 0
+        while src < file_size:
+            f.seek(src)
+            block = f.read(BLOCK_SIZE)
+            f.seek(dst)
+            f.write(block)
+            src += len(block)
+            dst += len(block)
+        f.truncate(dst)
+
+def process_file(filename, position):
+    truncate_file_at_zero_end(filename)
+    keep_content_after_position(filename, position)
+    print(f"Processed: {filename}")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python script_name.py <elf_file_path> <bin_files_directory>")
-        sys.exit(1)
-    
-    elf_path = sys.argv[1]
-    bin_files_directory = sys.argv[2]
+    parser = argparse.ArgumentParser(description="Trim trailing zeros and cut interval dumps at the .data offset (in place)")
+    parser.add_argument('elf_file', type=str, help="ELF file to extract .data start address")
+    parser.add_argument('bin_directory', type=str, help="Directory containing interval_*_dumpmem.bin")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Number of worker processes (<= 0: all cores, default 0)")
+    args = parser.parse_args()
     
     # 获取 .data 段的起始地址
-    data_section_start = get_data_section_start(elf_path)
+    data_section_start = get_data_section_start(args.elf_file)
 
-    if data_section_start is not None:
-        print(f"Data segment starts at: 0x{data_section_start:08x}")
+    if data_section_start is None:
+        print(f"Error: 无法从 {args.elf_file} 获取 .data 起始地址")
+        sys.exit(1)
+    print(f"Data segment starts at: 0x{data_section_start:08x}")
 
-    # 处理 bin 文件
-    for file_path in glob.glob(f"{bin_files_directory}/interval_*_dumpmem.bin"):
-        truncate_file_at_zero_end(file_path)
-        keep_content_after_position(file_path, data_section_start - 0x100000000)
-        print(f"Processed: {file_path}")
+    # 在进程池中处理所有 bin 文件
+    tasks = [(file_path, (file_path, data_section_start - 0x100000000))
+             for file_path in sorted(glob.glob(f"{args.bin_directory}/interval_*_dumpmem.bin"))]
+    failures, _ = run_batch(process_file, tasks, args.jobs)
+    sys.exit(1 if failures else 0)
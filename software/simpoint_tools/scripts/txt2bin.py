@@ -2,15 +2,15 @@ import argparse
 import os
 import glob
 import re
+import sys
 
-def convert_txt_to_bin(txt_file, bin_file):
-    with open(txt_file, 'r') as f_in, open(bin_file, 'wb') as f_out:
-        lines = f_in.readlines()
+# 共用 mem_builder 中的向量化 hex 转换引擎
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mem_builder'))
+from hexconv import convert
 
-        for line in lines:
-            line = line.strip()
-            bin_data = bytes.fromhex(line)[::-1]
-            f_out.write(bin_data)
+def convert_txt_to_bin(txt_file, bin_file):
+    # 每行 16 位十六进制按 little-endian 还原为 8 字节，整块向量化处理
+    convert('hex2bin', txt_file, bin_file)
     
 
 
@@ -0,0 +1,86 @@
+"""fuzz_interval.py：连续两次 retarget 都应取各 interval 的原始值，而不是上一次改写后的值。"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from fuzz_interval import IntervalRetarget, modify_init_data  # noqa: E402
+from interval import SEPARATOR, generate_riscv_assembly, index_path, parse_riscv_state  # noqa: E402
+
+LABELS = (17, 42, 99)
+
+
+def original(label, register):
+    """每个 interval 的每个寄存器取不同的值，便于区分。"""
+    return (label << 32) | (register << 8) | 0x5a
+
+
+def write_states(path):
+    with open(path, 'w') as f:
+        for label in LABELS:
+            f.write(f"Interval {label} Architecture State:\n")
+            f.write(f"pc: 0x{original(label, 99):016x}\n")
+            for r in range(32):
+                f.write(f"x{r}: 0x{original(label, r):016x}\n")
+            f.write(SEPARATOR + "\n")
+
+
+@pytest.fixture(params=['text', 'blob'])
+def asm_file(request, tmp_path):
+    write_states(tmp_path / 'interval_init.txt')
+    states = parse_riscv_state(str(tmp_path / 'interval_init.txt'))
+    asm = str(tmp_path / 'Interval_init.S')
+    blob = str(tmp_path / 'Interval_data.bin') if request.param == 'blob' else None
+    generate_riscv_assembly(states, asm, blob, index_file=index_path(asm))
+    return asm
+
+
+def current(asm):
+    """从文件中重新读出所有数据表当前的 ra / sp。"""
+    retarget = IntervalRetarget(asm)
+    read = {}
+    for table in retarget.tables:
+        for key in ('ra', 'sp'):
+            pos = table['slots'][key]
+            if retarget.blob_file is not None:
+                with open(retarget.blob_file, 'rb') as f:
+                    f.seek(pos)
+                    value = int.from_bytes(f.read(8), 'little')
+            else:
+                value = int(retarget.lines[pos].split()[1], 16)
+            read.setdefault(table['name'], {})[key] = value
+    return read
+
+
+def test_retarget_twice(asm_file):
+    # 相当于连续两次 make choose_idx：每次都重新载入已被改写过的文件
+    modify_init_data(asm_file, 42)
+    values = modify_init_data(asm_file, 17)
+    assert values == {'ra': original(17, 1), 'sp': original(17, 2)}
+    for table in current(asm_file).values():
+        assert table == values
+
+
+def test_retarget_sweep(asm_file):
+    # 库接口：同一对象上依次切换，再由新对象载入改写过的文件继续切换
+    retarget = IntervalRetarget(asm_file)
+    for label in (42, 99):
+        retarget.retarget(label)
+        retarget.save()
+    retarget = IntervalRetarget(asm_file)
+    for label in LABELS:
+        assert retarget.values(label) == {'pc': original(label, 99), 'ra': original(label, 1),
+                                          'sp': original(label, 2), 't4': original(label, 29)}
+
+
+def test_blob_save_touches_asm(tmp_path):
+    write_states(tmp_path / 'interval_init.txt')
+    states = parse_riscv_state(str(tmp_path / 'interval_init.txt'))
+    asm = str(tmp_path / 'Interval_init.S')
+    generate_riscv_assembly(states, asm, str(tmp_path / 'Interval_data.bin'), index_file=index_path(asm))
+    os.utime(asm, (0, 0))
+    modify_init_data(asm, 42)
+    # .incbin 不在依赖文件中，.S 必须变新才会重新汇编
+    assert os.path.getmtime(asm) > 0
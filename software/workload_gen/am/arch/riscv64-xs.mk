@@ -21,7 +21,6 @@ AM_SRCS := noop/isa/riscv/trm.c \
            xs/isa/riscv/plic.c \
            xs/isa/riscv/pma.c \
            xs/isa/riscv/cache.c \
-           nemu/isa/riscv/boot/start.S \
            nemu/isa/riscv/boot/Interval_init.S
 
 CFLAGS  += -I$(AM_HOME)/am/src/nemu/include -I$(AM_HOME)/am/src/xs/include -DISA_H=\"riscv.h\"
@@ -32,10 +31,36 @@ ASFLAGS += -DMAINARGS=\"$(mainargs)\"
 LDFLAGS += -L $(AM_HOME)/am/src/nemu/ldscript
 LDFLAGS += -T $(AM_HOME)/am/src/nemu/isa/riscv/boot/loader64.ld
 
+# start.S 按 SimPoint 阶段编译为两个对象（仅差 -DSIMPOINT_AFTER），都随 am 一起构建并缓存，
+# 链接时按 SIMPOINT=before|after 选择其一，切换阶段只需重新链接
+SIMPOINT   ?= before
+START_SRC   = $(AM_HOME)/am/src/nemu/isa/riscv/boot/start.S
+START_DIR   = $(AM_HOME)/am/build/$(ARCH)/start
+START_OBJS  = $(START_DIR)/start-before.o $(START_DIR)/start-after.o
+START_OBJ   = $(START_DIR)/start-$(SIMPOINT).o
+
+ifeq ($(filter $(SIMPOINT),before after),)
+$(error Invalid SIMPOINT. Supported: before after)
+endif
+
+ifeq ($(NAME),am)
+default: $(START_OBJS)
+
+$(START_DIR)/start-before.o: $(START_SRC)
+	@mkdir -p $(dir $@) && echo + AS $< [before]
+	@$(AS) $(ASFLAGS) -c -o $@ $<
+
+$(START_DIR)/start-after.o: $(START_SRC)
+	@mkdir -p $(dir $@) && echo + AS $< [after]
+	@$(AS) $(ASFLAGS) -DSIMPOINT_AFTER -c -o $@ $<
+
+-include $(START_OBJS:.o=.d)
+endif
+
 # @$(OBJDUMP) -dj .text -sj .data $(BINARY).elf > $(BINARY).txt
 image:
 	@echo + LD "->" $(BINARY_REL).elf
-	@$(LD) $(LDFLAGS) --gc-sections -o $(BINARY).elf --start-group $(LINK_FILES) --end-group
+	@$(LD) $(LDFLAGS) --gc-sections -o $(BINARY).elf $(START_OBJ) --start-group $(LINK_FILES) --end-group
 	@$(OBJDUMP) -d $(BINARY).elf > $(BINARY).txt
 	@echo + OBJCOPY "->" $(BINARY_REL).bin
 	@$(OBJCOPY) -S --set-section-flags .bss=alloc,contents -O binary $(BINARY).elf $(BINARY).bin